@@ -0,0 +1,332 @@
+import atexit
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+import openai
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+from classifier import classify_transaction
+from config import AI_CACHE_SAVE_INTERVAL, HISTORY_TOKEN_BUDGET, LLM_BATCH_SIZE, LLM_CONCURRENCY, LLM_MAX_ATTEMPTS, LLM_RATE_PER_SEC
+from metrics import TIMEOUT_ERRORS, get_metrics
+from rate_limit import TokenBucket
+from rules import get_rules
+
+# Amounts within this fraction of a threshold are left to the LLM
+AMBIGUITY_MARGIN = 0.05
+
+CATEGORIES = ("Normal", "New", "Abnormal")
+CATEGORY_PATTERN = re.compile(r"\b(normal|new|abnormal)\b", re.IGNORECASE)
+
+# Transient API failures worth retrying with backoff
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+
+def estimate_tokens(text):
+    # Rough GPT tokenizer average for English and numbers: ~4 characters/token
+    return len(text) // 4 + 1
+
+
+# Compact stand-in for the raw history list in prompts: summary statistics,
+# how often this amount was sent before, and the most repeated amounts for
+# as long as they fit in token_budget. Its size does not grow with the
+# history.
+def summarize_history(amount, history, token_budget=HISTORY_TOKEN_BUDGET):
+    counts = history.counts() if hasattr(history, "counts") else Counter(history)
+    size = len(history)
+    if not size:
+        return "no previous transactions"
+
+    total = sum(value * count for value, count in counts.items())
+    lines = [
+        f"{size} previous transactions, total {total:.2f}, "
+        f"min {min(counts):.2f}, max {max(counts):.2f}, mean {total / size:.2f}",
+        f"this amount was sent {counts.get(amount, 0)} times before",
+    ]
+    summary = "; ".join(lines)
+
+    repeated = []
+    for value, count in heapq.nlargest(50, counts.items(), key=lambda item: item[1]):
+        if count < 2:
+            break
+        entry = f"{value:.2f} x{count}"
+        candidate = f"{summary}; repeated amounts: {', '.join(repeated + [entry])}"
+        if estimate_tokens(candidate) > token_budget:
+            break
+        repeated.append(entry)
+    if repeated:
+        summary = f"{summary}; repeated amounts: {', '.join(repeated)}"
+    return summary
+
+
+_llm_limiter = None
+_llm_limiter_lock = threading.Lock()
+
+# Limiter for completion requests made from the current thread, set by
+# ai_classify_many; unset means the process-wide one
+_request_limiter = ContextVar("llm_request_limiter", default=None)
+
+
+# Process-wide limit of LLM_RATE_PER_SEC requests, or None when it is 0
+def get_llm_limiter():
+    global _llm_limiter
+    with _llm_limiter_lock:
+        if _llm_limiter is None and LLM_RATE_PER_SEC > 0:
+            _llm_limiter = TokenBucket(LLM_RATE_PER_SEC)
+        return _llm_limiter
+
+
+@retry(
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    wait=wait_exponential_jitter(initial=0.5, max=20),
+    stop=stop_after_attempt(LLM_MAX_ATTEMPTS),
+    reraise=True,
+)
+def complete(prompt):
+    # One rate-limit token per attempt, so retries count against the limit
+    limiter = _request_limiter.get() or get_llm_limiter()
+    if limiter is not None:
+        limiter.acquire()
+    # Timed per attempt, so retried failures show up in the error counts
+    with get_metrics().time("llm_completion", timeout_errors=TIMEOUT_ERRORS + (openai.error.Timeout,)):
+        response = openai.ChatCompletion.create(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": "You are a financial transaction classifier."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.0
+        )
+    return response.choices[0].message["content"].strip()
+
+
+# The category a reply names, e.g. "Abnormal." or "Category: abnormal";
+# None when it names none or more than one
+def normalize_label(reply):
+    found = {match.capitalize() for match in CATEGORY_PATTERN.findall(reply)}
+    return found.pop() if len(found) == 1 else None
+
+
+# The rule text is generated from the same rule set as classify_transaction
+def ai_classify(amount, history, currency=None, country=None):
+    prompt = f"""
+You are a financial transaction classifier.
+
+{get_rules().prompt_text(currency, country)}
+
+Transaction History: {summarize_history(amount, history)}
+New Transaction Amount: {amount}
+
+Classify the transaction strictly as one of: Normal, New, Abnormal.
+Category:
+"""
+    # "Abnormal." comes back as "Abnormal"; unrecognized replies unchanged
+    reply = complete(prompt)
+    return normalize_label(reply) or reply
+
+
+# Several transactions in one prompt, answered as a JSON array. Falls back
+# to one request per transaction if the reply can't be used.
+def ai_classify_packed(transactions):
+    items = "\n".join(
+        f"{i}. Transaction History: {summarize_history(amount, history)}\n   New Transaction Amount: {amount}"
+        for i, (amount, history) in enumerate(transactions, start=1)
+    )
+    prompt = f"""
+You are a financial transaction classifier.
+
+{get_rules().prompt_text()}
+
+Transactions:
+{items}
+
+Classify each transaction strictly as one of: Normal, New, Abnormal.
+Reply with only a JSON array of categories in the same order, e.g. ["Normal", "Abnormal"].
+"""
+    reply = complete(prompt).strip("`").removeprefix("json").strip()
+    try:
+        labels = json.loads(reply)
+    except ValueError:
+        labels = None
+    if (not isinstance(labels, list) or len(labels) != len(transactions)
+            or not all(isinstance(label, str) and label in CATEGORIES for label in labels)):
+        return [ai_classify(amount, history) for amount, history in transactions]
+    return labels
+
+
+# Classify many (amount, history) pairs with up to `concurrency` requests in
+# flight, `batch_size` transactions per prompt and a TokenBucket limiting
+# the request rate (by default the LLM_RATE_PER_SEC one). Every completion
+# request takes a token, fallbacks and retries included. Labels come back
+# in input order.
+def ai_classify_many(transactions, concurrency=LLM_CONCURRENCY, batch_size=LLM_BATCH_SIZE, limiter=None):
+    if limiter is None:
+        limiter = get_llm_limiter()
+    transactions = list(transactions)
+    batches = [transactions[i:i + batch_size] for i in range(0, len(transactions), batch_size)]
+
+    def run(batch):
+        _request_limiter.set(limiter)
+        if len(batch) == 1:
+            return [ai_classify(*batch[0])]
+        return ai_classify_packed(batch)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return [label for labels in pool.map(run, batches) for label in labels]
+
+
+# LRU cache whose entries also expire after `ttl` seconds. Expiry times are
+# wall-clock so a cache saved to `path` (JSON) stays valid across restarts.
+# Changes are saved by a background thread every `save_interval` seconds
+# and at exit, never by set() itself, so lookups don't wait on file writes.
+class MemoCache:
+    def __init__(self, maxsize=10_000, ttl=24 * 3600, path=None, save_interval=AI_CACHE_SAVE_INTERVAL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            self._load()
+        if path:
+            threading.Thread(target=self._run, daemon=True, name="memo-cache-saver").start()
+            atexit.register(self.save)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, value, expires_at in saved[-self.maxsize:]:
+            if expires_at > now:
+                self._entries[key] = (value, expires_at)
+
+    def save(self):
+        # Copy the entries under the lock, write them outside it
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                entries = [[key, value, expires_at] for key, (value, expires_at) in self._entries.items()]
+                self._dirty = False
+            # Write to a temp file first so a crash never leaves a torn cache
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while True:
+            time.sleep(self.save_interval)
+            try:
+                self.save()
+            except OSError as e:
+                print(f"LLM answer cache not saved to {self.path}: {e}")
+
+
+def is_ambiguous(amount, repeated_count, margin=AMBIGUITY_MARGIN, currency=None, country=None):
+    # Close to an amount threshold, or one repeat away from being blocked
+    limits = get_rules().thresholds(currency, country)
+    near_threshold = any(
+        abs(amount - limit) <= limit * margin for limit in (limits.new_amount, limits.abnormal_amount)
+    )
+    return near_threshold or repeated_count == limits.repeat_limit - 1
+
+
+def cache_key(amount, repeated_count, currency=None, country=None):
+    # The rules only depend on the amount, how often it was already sent
+    # (repeats past the limit all mean the same thing) and which thresholds
+    # apply; naira-only keys keep their old form
+    limits = get_rules().thresholds(currency, country)
+    key = f"{round(float(amount), 2)}|{min(repeated_count, limits.repeat_limit)}"
+    if currency or country:
+        key += f"|{currency or ''}|{country or ''}"
+    return key
+
+
+# Rules first: clear-cut transactions are answered by classify_transaction,
+# ambiguous ones by the LLM through a memo cache.
+class CascadeClassifier:
+    def __init__(self, cache=None, margin=AMBIGUITY_MARGIN, llm=ai_classify):
+        self.cache = cache if cache is not None else MemoCache()
+        self.margin = margin
+        self.llm = llm
+        self.rule_decisions = 0
+        self.llm_calls = 0
+
+    def classify(self, amount, history, currency=None, country=None):
+        repeated_count = history.count(amount)
+        if not is_ambiguous(amount, repeated_count, self.margin, currency, country):
+            self.rule_decisions += 1
+            return classify_transaction(amount, history, currency, country)
+
+        key = cache_key(amount, repeated_count, currency, country)
+        label = self.cache.get(key)
+        if label is None:
+            self.llm_calls += 1
+            label = normalize_label(self.llm(amount, history, currency, country) or "")
+            if label is None:
+                # Unusable reply: answer with the rules and don't cache it
+                return classify_transaction(amount, history, currency, country)
+            self.cache.set(key, label)
+        return label
+
+    def stats(self):
+        total = self.rule_decisions + self.cache.hits + self.llm_calls
+        return {
+            "transactions": total,
+            "rule_decisions": self.rule_decisions,
+            "cache_hits": self.cache.hits,
+            "cache_hit_rate": self.cache.hit_rate,
+            "llm_calls": self.llm_calls,
+            "llm_calls_avoided": total - self.llm_calls,
+        }
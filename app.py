@@ -1,11 +1,40 @@
 import streamlit as st
 import requests
-import json
-
-API_URL = "https://riskiq-ai-kyc-sentinel-2.onrender.com/api/Transactions/process-natural"
-USERS_API_URL = "https://riskiq-ai-kyc-sentinel-2.onrender.com/api/Transactions/users"
-PATTERNS_API_URL = "https://riskiq-ai-kyc-sentinel-2.onrender.com/api/Transactions/patterns"
-TRANSFER_API_URL = "https://riskiq-ai-kyc-sentinel-2.onrender.com/api/Transactions/process"
+import math
+import time
+import uuid
+from concurrent.futures import wait
+
+from bulk_transfer import COUNTRY_CODES, CURRENCIES, BulkProgress, read_transfers, submit_transfers
+from chat_store import ChatStore
+from chat_stream import STREAM_HEADERS, extract_reply, iter_reply
+from coalesce import Duplicate, get_transfer_coalescer
+from config import (
+    CHAT_OLDER_PAGES,
+    CHAT_PAGE_SIZE,
+    CHAT_STREAMING,
+    CHAT_WINDOW,
+    COLD_START_WAIT,
+    METRICS_PANEL,
+    PATTERNS_FIELDS,
+    PATTERNS_TTL,
+    TRANSFER_POLL_INTERVAL,
+    USER_SELECTOR_PAGE_SIZE,
+    USERS_FIELDS,
+    USERS_PAGE_SIZE,
+    USERS_TTL,
+)
+from http_client import get_client
+from metrics import get_metrics
+from metrics_panel import show_metrics_panel
+from prefetch import Prefetcher
+from snapshot_cache import SnapshotCache, SnapshotStore, describe_status
+from transfer_queue import TransferQueue
+from user_index import UserIndex
+
+# Full script runs are timed; fragment reruns don't reach the end of the script
+script_start = time.perf_counter()
+metrics = get_metrics()
 
 # Page config for better appearance
 st.set_page_config(
@@ -171,60 +200,125 @@ if "show_transfer_modal" not in st.session_state:
     st.session_state.show_transfer_modal = False
 
 
-# Function to fetch users
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_users():
-    try:
-        response = requests.get(USERS_API_URL, timeout=60)
-        if response.status_code == 200:
-            users_data = response.json()
-            # Return the full user data instead of just emails
-            if isinstance(users_data, list):
-                return users_data
-            else:
-                return []
-        else:
-            st.error(f"Failed to fetch users: {response.status_code}")
-            return []
-    except Exception as e:
-        st.error(f"Error fetching users: {str(e)}")
-        return []
+USERS_KEY = "all"
+
+
+# Function to fetch users (runs on the snapshot cache's worker threads, so
+# failures are raised and reported through the cache status)
+def load_users(_key):
+    users = []
+    page = 1
+    while True:
+        # Page through the endpoint when USERS_PAGE_SIZE is set
+        params = {"page": page, "pageSize": USERS_PAGE_SIZE} if USERS_PAGE_SIZE else None
+        # Only the fields shown here; unchanged pages cost a 304
+        status, users_data = get_client().get_json("users", params=params, fields=USERS_FIELDS)
+        if status not in (200, 304):
+            raise RuntimeError(f"Failed to fetch users: {status}")
+        # Return the full user data instead of just emails
+        if not isinstance(users_data, list):
+            return users
+        users.extend(users_data)
+        if not USERS_PAGE_SIZE or len(users_data) < USERS_PAGE_SIZE:
+            return users
+        page += 1
 
 
 # Function to fetch user patterns
-@st.cache_data(ttl=300)
+def load_user_patterns(user_id):
+    status, patterns = get_client().get_json("patterns", f"/{user_id}", fields=PATTERNS_FIELDS)
+    if status not in (200, 304):
+        raise RuntimeError(f"Failed to fetch user patterns: {status}")
+    return patterns
+
+
+# Last good users and patterns responses, kept on disk and served straight
+# away (even after a restart) while they are refreshed in the background
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore()
+
+
+@st.cache_resource
+def get_users_cache():
+    return SnapshotCache("users", load_users, get_snapshot_store(), ttl=USERS_TTL)
+
+
+@st.cache_resource
+def get_patterns_cache():
+    return SnapshotCache("patterns", load_user_patterns, get_snapshot_store(), ttl=PATTERNS_TTL)
+
+
+# Only a first-ever start, with nothing on disk, waits for the backend, and
+# then for at most COLD_START_WAIT seconds
+def fetch_users():
+    snapshot = get_users_cache().get(USERS_KEY, wait=COLD_START_WAIT)
+    return snapshot.value if snapshot else []
+
+
+# Never waits: patterns that aren't loaded yet show up on a later rerun
 def fetch_user_patterns(user_id):
-    try:
-        response = requests.get(f"{PATTERNS_API_URL}/{user_id}", timeout=60)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Failed to fetch user patterns: {response.status_code}")
-            return None
-    except Exception as e:
-        st.error(f"Error fetching user patterns: {str(e)}")
-        return None
+    snapshot = get_patterns_cache().get(str(user_id))
+    return snapshot.value if snapshot else None
 
 
-# Function to process transfer
-def process_transfer(transfer_data):
+# Search index over the user list, rebuilt only when a new snapshot arrives
+@st.cache_resource(max_entries=1)
+def get_user_index(fetched_at, _users):
+    return UserIndex(_users)
+
+
+# Function to process transfer (runs on the transfer queue's worker threads,
+# so errors are reported on the ticket rather than with st.error).
+# `idempotency_key` identifies the transfer (a ticket id or a bulk row) and
+# is the same every time that transfer is sent.
+def process_transfer(transfer_data, idempotency_key):
     print('Data', transfer_data)
-    try:
-        response = requests.post(
-            TRANSFER_API_URL,
-            json=transfer_data,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-        print(response)
-        return response
-    except Exception as e:
-        st.error(f"Transfer error: {str(e)}")
-        return None
+    # Double submits of the same payload share one request; the repeats are
+    # reported as duplicates, not as transfers of their own
+    response, coalesced = get_transfer_coalescer().call(
+        transfer_data,
+        lambda key: get_client().post("transfer", json=transfer_data, headers={"Idempotency-Key": key}),
+        idempotency_key,
+    )
+    print(response)
+    return Duplicate(response) if coalesced else response
+
+
+# Transfers are sent in the background so the script thread never waits on
+# the backend
+@st.cache_resource
+def get_transfer_queue():
+    return TransferQueue(process_transfer)
+
+
+# Background warm-up of the patterns snapshots for the listed users
+@st.cache_resource
+def get_pattern_prefetcher():
+    # Resolved here, on the script thread: prefetch workers have no script
+    # context to call cache_resource functions from
+    cache = get_patterns_cache()
+    return Prefetcher(lambda user_id: cache.ensure(str(user_id)))
+
+
+# Shown while the first users snapshot is still on its way; reruns the page
+# once it arrives
+@st.fragment(run_every=1)
+def users_loading():
+    if get_users_cache().peek(USERS_KEY) is not None:
+        st.rerun()
+    status = get_users_cache().status(USERS_KEY)
+    if status["error"]:
+        st.warning(describe_status(status, "users"))
+    else:
+        st.info(describe_status(status, "users"))
 
 
 # Fetch users
 users_list = fetch_users()
+user_snapshot = get_users_cache().peek(USERS_KEY)
+user_index = get_user_index(user_snapshot.fetched_at if user_snapshot else None, users_list)
+get_pattern_prefetcher().warm(user.get('id') for user in users_list if user.get('id'))
 
 # User Selection Section
 st.markdown("### 👤 User Selection")
@@ -233,19 +327,39 @@ col1, col2 = st.columns([3, 1])
 
 with col1:
     if users_list:
-        # Create options for selectbox with user emails
-        user_options = [f"{user.get('email', 'Unknown')} - {user.get('name', 'No Name')}" for user in users_list]
-        selected_user_index = st.selectbox(
-            "Select User Email",
-            options=range(len(user_options)),
-            format_func=lambda x: user_options[x],
-            help="Choose a user from the available list",
+        query = st.text_input(
+            "Search Users",
+            placeholder="🔍 Search by email or name",
             label_visibility="collapsed"
         )
-        selected_user = users_list[selected_user_index]
-        selected_email = selected_user.get('email', '')
+        matches = user_index.search(query)
+
+        # Only one page of matches is formatted and sent to the browser
+        page_count = max(1, math.ceil(len(matches) / USER_SELECTOR_PAGE_SIZE))
+        page = 1
+        if page_count > 1:
+            page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+        page_matches = matches[(page - 1) * USER_SELECTOR_PAGE_SIZE:page * USER_SELECTOR_PAGE_SIZE]
+
+        if page_matches:
+            selected_user_index = st.selectbox(
+                "Select User Email",
+                options=page_matches,
+                format_func=user_index.label,
+                help=f"{len(matches)} matching users",
+                label_visibility="collapsed"
+            )
+            selected_user = users_list[selected_user_index]
+            selected_email = selected_user.get('email', '')
+        else:
+            st.info("No users match your search.")
+            selected_user = {"email": "", "name": "No Match", "id": None}
+            selected_email = ""
     else:
-        st.warning("⚠️ No users available. Please check your connection.")
+        if user_snapshot is None:
+            users_loading()
+        else:
+            st.warning("⚠️ No users available. Please check your connection.")
         selected_email = st.text_input(
             "Email Address",
             placeholder="user@example.com",
@@ -256,13 +370,27 @@ with col1:
 
 with col2:
     if st.button("🔄 Refresh", help="Reload user list", use_container_width=True):
-        st.cache_data.clear()
+        # Only the user list and the selected user's patterns are refetched;
+        # other users' patterns and other sessions' data are left alone.
+        # Until the new data arrives the current snapshots stay on screen.
+        refreshes = [get_users_cache().invalidate(USERS_KEY)]
+        if selected_user.get('id'):
+            refreshes.append(get_patterns_cache().invalidate(str(selected_user['id'])))
+        wait(refreshes, timeout=COLD_START_WAIT)
         st.rerun()
 
+if user_snapshot is not None:
+    st.caption(describe_status(get_users_cache().status(USERS_KEY), "users"))
+
 # User Profile Section
-if selected_email and users_list:
+# Fragments rerun on their own: interacting inside one re-executes only that
+# function, not the CSS, user fetch and selector above.
+@st.fragment
+def user_profile(selected_user):
     user_id = selected_user.get('id')
     if user_id:
+        get_pattern_prefetcher().touch(user_id)
+
         # Fetch user patterns
         user_patterns = fetch_user_patterns(user_id)
 
@@ -279,15 +407,23 @@ if selected_email and users_list:
             </div>
         </div>
         """, unsafe_allow_html=True)
+        st.caption(describe_status(get_patterns_cache().status(str(user_id)), "risk patterns"))
 
         # Transfer button
         col1, col2, col3 = st.columns([1, 1, 1])
         with col2:
             if st.button("💸 Transfer", key="transfer_btn", use_container_width=True):
                 st.session_state.show_transfer_modal = True
+                # The modal replaces the chat, so the whole page has to rerun
+                st.rerun()
+
+
+if selected_email and users_list:
+    user_profile(selected_user)
 
 # Transfer Modal
-if st.session_state.show_transfer_modal:
+@st.fragment
+def transfer_form(selected_email):
     st.markdown("---")
     st.markdown("### 💸 Transfer Funds")
 
@@ -304,7 +440,7 @@ if st.session_state.show_transfer_modal:
 
         currency = st.selectbox(
             "Currency",
-            options=["naira", "dollar", "euro", "pound"],
+            options=CURRENCIES,
             index=0,
             help="Select the currency"
         )
@@ -317,7 +453,7 @@ if st.session_state.show_transfer_modal:
 
         country_code = st.selectbox(
             "Country Code",
-            options=["NG", "US", "UK", "EU"],
+            options=COUNTRY_CODES,
             index=0,
             help="Select the country code"
         )
@@ -334,34 +470,82 @@ if st.session_state.show_transfer_modal:
                 "destinationAccount": destination_account
             }
 
-            # Process transfer
-            with st.spinner("Processing transfer..."):
-                response = process_transfer(transfer_data)
+            # Queue the transfer; its status shows up in the tickets list below
+            ticket_id = get_transfer_queue().submit(transfer_data)
+            tickets = st.session_state.setdefault("transfer_tickets", [])
+            tickets.insert(0, ticket_id)
+            del tickets[20:]
+            st.info(f"⏳ Transfer queued (ticket {ticket_id[:8]})")
 
-                if response and response.status_code == 200:
-                    try:
-                        response_data = response.json()
-                        # Extract statusMessage from the response
-                        if "message" in response_data:
-                            status_message = response_data["message"]
-                            st.success(f"✅ {status_message}")
-                        else:
-                            st.success("✅ Transfer processed successfully!")
-                    except json.JSONDecodeError:
-                        st.success("✅ Transfer processed successfully!")
+    # Transfers keep running after the form is closed
+    if st.button("Close", key="close_transfer", use_container_width=True):
+        st.session_state.show_transfer_modal = False
+        st.rerun()
 
-                    st.session_state.show_transfer_modal = False
-                elif response:
-                    try:
-                        error_data = response.json()
-                        if "message" in error_data:
-                            st.error(f"❌ {error_data['message']}")
-                        else:
-                            st.error(f"❌ Transfer failed: {response.status_code} - {response.text}")
-                    except json.JSONDecodeError:
-                        st.error(f"❌ Transfer failed: {response.status_code} - {response.text}")
-                else:
-                    st.error("❌ Transfer failed due to connection error")
+
+# Bulk transfers from a CSV/Parquet upload, one row per transfer with
+# amount, currency, countryCode and destinationAccount columns
+@st.fragment
+def bulk_transfer_panel(selected_email):
+    with st.expander("📄 Bulk transfer upload"):
+        upload = st.file_uploader("Transfers file", type=["csv", "parquet"])
+        if upload is None or not st.button("🚀 Submit all transfers", use_container_width=True):
+            return
+
+        progress = BulkProgress()
+        status = st.empty()
+        problems = []
+        try:
+            # Keyed by the uploaded file, so submitting it again resends
+            # each row under its first key
+            for outcome in submit_transfers(read_transfers(upload), process_transfer, selected_email,
+                                            batch_id=upload.file_id):
+                progress.add(outcome)
+                if outcome["status"] != "succeeded":
+                    problems.append(outcome)
+                if progress.rows % 50 == 0:
+                    status.markdown(f"Processed {progress.rows:,} rows · {progress.rows_per_sec:,.1f} rows/sec")
+        except ValueError as e:
+            st.error(f"❌ {str(e)}")
+            return
+
+        counts = progress.counts
+        status.markdown(
+            f"Processed {progress.rows:,} rows · {progress.rows_per_sec:,.1f} rows/sec — "
+            f"✅ {counts['succeeded']:,} succeeded, ❌ {counts['failed']:,} failed, "
+            f"🔁 {counts['duplicate']:,} duplicates not sent again, ⚠️ {counts['invalid']:,} invalid"
+        )
+        if problems:
+            st.dataframe(problems, use_container_width=True)
+
+
+TICKET_ICONS = {"queued": "⏳", "processing": "🔄", "succeeded": "✅", "failed": "❌", "duplicate": "🔁"}
+
+
+# Status of this session's latest transfers, refreshed every
+# TRANSFER_POLL_INTERVAL seconds
+@st.fragment(run_every=TRANSFER_POLL_INTERVAL)
+def transfer_tickets():
+    tickets = [get_transfer_queue().status(ticket_id) for ticket_id in st.session_state.get("transfer_tickets", [])]
+    tickets = [ticket for ticket in tickets if ticket]
+    if not tickets:
+        return
+
+    st.markdown("#### Transfers")
+    for ticket in tickets:
+        transfer = ticket["transfer"]
+        summary = f"{transfer['amount']:,.2f} {transfer['currency']} → {transfer['destinationAccount']}"
+        status = ticket["message"] or ticket["status"].capitalize()
+        st.markdown(f"{TICKET_ICONS[ticket['status']]} `{ticket['id'][:8]}` {summary} — {status}")
+        if ticket["status"] == "failed" and st.button("🔁 Retry", key=f"retry_{ticket['id']}"):
+            get_transfer_queue().retry(ticket["id"])
+
+
+if st.session_state.show_transfer_modal:
+    transfer_form(selected_email)
+    bulk_transfer_panel(selected_email)
+
+transfer_tickets()
 
 # if st.session_state.show_transfer_modal:
 #     st.markdown("---")
@@ -453,7 +637,34 @@ if st.session_state.show_transfer_modal:
 #                 st.rerun()
 
 # Chat Section
-if not st.session_state.show_transfer_modal:
+@st.cache_resource
+def get_chat_store():
+    return ChatStore()
+
+
+# Loaded older messages are a bounded view: at most CHAT_OLDER_PAGES pages
+CHAT_OLDER_LIMIT = CHAT_OLDER_PAGES * CHAT_PAGE_SIZE
+
+
+# Append a chat message, moving anything beyond the last CHAT_WINDOW
+# messages out of session memory into the chat store
+def add_chat_message(role, content, email):
+    messages = st.session_state["messages"]
+    messages.append({"role": role, "content": content, "email": email})
+    if len(messages) > CHAT_WINDOW:
+        spilled = get_chat_store().append(st.session_state["chat_session_id"], messages[:-CHAT_WINDOW])
+        del messages[:-CHAT_WINDOW]
+        # Keep already loaded older pages contiguous with the window,
+        # dropping their oldest messages so the view stays bounded
+        older = st.session_state["chat_older"]
+        if older:
+            older.extend(spilled)
+            del older[:-CHAT_OLDER_LIMIT]
+
+
+# Chat Section
+@st.fragment
+def chat_panel(selected_email):
     # st.markdown("""
     # <div class="chat-header">
     #     💬 Risk Assessment Chat
@@ -469,8 +680,22 @@ if not st.session_state.show_transfer_modal:
                        "about risk analysis, compliance, or potential concerns."
         }]
 
+    if "chat_session_id" not in st.session_state:
+        st.session_state["chat_session_id"] = uuid.uuid4().hex
+        st.session_state["chat_older"] = []
+
+    # Older messages are only read back from the store on request
+    older = st.session_state["chat_older"]
+    oldest_id = older[0]["id"] if older else None
+    if len(older) >= CHAT_OLDER_LIMIT:
+        st.caption(f"Showing the last {len(older) + len(st.session_state['messages'])} messages")
+    elif get_chat_store().has_older(st.session_state["chat_session_id"], oldest_id):
+        if st.button("⬆️ Load older messages", key="load_older_messages"):
+            limit = min(CHAT_PAGE_SIZE, CHAT_OLDER_LIMIT - len(older))
+            older[:0] = get_chat_store().older(st.session_state["chat_session_id"], oldest_id, limit)
+
     # Display chat messages
-    for msg in st.session_state["messages"]:
+    for msg in older + st.session_state["messages"]:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
 
@@ -481,13 +706,14 @@ if not st.session_state.show_transfer_modal:
             st.error("⚠️ Please select a user above before asking questions.")
         else:
             # Add user message
-            st.session_state["messages"].append({"role": "user", "content": prompt})
+            add_chat_message("user", prompt, selected_email)
 
             with st.chat_message("user"):
                 st.markdown(prompt)
 
             # Get AI response
             with st.chat_message("assistant"):
+                stream = None
                 with st.spinner("🔍 Analyzing transaction risk..."):
                     try:
                         payload = {
@@ -496,31 +722,17 @@ if not st.session_state.show_transfer_modal:
                             "request": prompt,
                         }
 
-                        response = requests.post(
-                            API_URL,
-                            json=payload,
-                            headers={"Content-Type": "application/json"},
-                            timeout=30
-                        )
+                        if CHAT_STREAMING:
+                            # Returns as soon as the headers arrive; the body is read below
+                            response = get_client().post("chat", json=payload, stream=True, headers=STREAM_HEADERS)
+                        else:
+                            response = get_client().post("chat", json=payload)
 
                         if response.status_code == 200:
-                            response_data = response.json()
-
-                            # Extract statusMessage from the response
-                            if "statusMessage" in response_data:
-                                reply = response_data["statusMessage"]
+                            if CHAT_STREAMING:
+                                stream = iter_reply(response)
                             else:
-                                # Fallback to other possible response fields
-                                if "response" in response_data:
-                                    reply = response_data["response"]
-                                elif "message" in response_data:
-                                    reply = response_data["message"]
-                                elif "reply" in response_data:
-                                    reply = response_data["reply"]
-                                elif "result" in response_data:
-                                    reply = response_data["result"]
-                                else:
-                                    reply = f"✅ Analysis complete: {response_data}"
+                                reply = extract_reply(response.json())
                         else:
                             reply = f"❌ Error {response.status_code}: {response.text}"
 
@@ -531,10 +743,20 @@ if not st.session_state.show_transfer_modal:
                     except Exception as e:
                         reply = f"❌ Unexpected error: {str(e)}"
 
-                    # Add AI response
-                    st.session_state["messages"].append({"role": "assistant", "content": reply})
+                # Render tokens as they arrive
+                if stream is not None:
+                    try:
+                        with metrics.time("chat_stream"):
+                            reply = st.write_stream(stream)
+                    except requests.exceptions.RequestException as e:
+                        reply = f"❌ The analysis stream was interrupted: {str(e)}"
+                        st.markdown(reply)
+                else:
                     st.markdown(reply)
 
+                # Add AI response
+                add_chat_message("assistant", reply, selected_email)
+
     # Reset button at the bottom
     st.markdown("<br>", unsafe_allow_html=True)
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -544,4 +766,13 @@ if not st.session_state.show_transfer_modal:
     #             "role": "assistant",
     #             "content": "👋 Ready for a new transaction analysis! Please select a user and ask your questions."
     #         }]
-    #         st.rerun()
\ No newline at end of file
+    #         st.rerun()
+
+
+if not st.session_state.show_transfer_modal:
+    chat_panel(selected_email)
+
+if METRICS_PANEL:
+    show_metrics_panel()
+
+metrics.observe("script_run_duration_seconds", time.perf_counter() - script_start, app="app")
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from rules import get_rules
+
+
+# Number of earlier rows with the same (account, amount) for every row,
+# i.e. what history.count(amount) would return when replaying the rows in
+# order. Only rows marked in `counted` (default: all) are in the history.
+# Rows blocked for their repeats don't reach the history either, but an
+# amount is only blocked that way once it is already at the repeat limit,
+# so the label is the same either way (exact as long as one account's
+# repeat limit doesn't vary by country).
+def repeated_counts(amounts, account_ids=None, counted=None):
+    amounts = np.asarray(amounts, dtype=float)
+    if account_ids is None:
+        account_ids = np.zeros(len(amounts), dtype=np.int8)
+    keys = pd.DataFrame({"account": account_ids, "amount": amounts})
+    groups = keys.groupby(["account", "amount"], sort=False, dropna=False)
+    if counted is None:
+        return groups.cumcount().to_numpy()
+    counted = np.asarray(counted, dtype=np.int64)
+    group_ids = groups.ngroup().to_numpy()
+    return pd.Series(counted).groupby(group_ids, sort=False).cumsum().to_numpy() - counted
+
+
+# Vectorized classify_transaction over whole columns, rows in chronological
+# order, with optional per-row currencies and countries. Returns an object
+# array of "Normal" / "New" / "Abnormal".
+def classify_batch(amounts, account_ids=None, currencies=None, countries=None):
+    amounts = np.asarray(amounts, dtype=float)
+    rules = get_rules()
+    limits = rules.thresholds_batch(len(amounts), currencies, countries)
+    # Amounts over their currency's abnormal threshold never enter the
+    # history. With one set of thresholds that blocks whole (account, amount)
+    # groups, whose labels don't depend on the count.
+    counted = None
+    if currencies is not None or countries is not None:
+        counted = amounts < limits.abnormal_amount
+    repeats = repeated_counts(amounts, account_ids, counted)
+    return rules.classify_batch(amounts, repeats, limits=limits)
+
+
+# DataFrame entry point; the result is aligned to df.index
+def classify_frame(df, amount_col="amount", account_col="account_id", currency_col="currency",
+                   country_col="countryCode"):
+    account_ids = df[account_col].to_numpy() if account_col in df else None
+    currencies = df[currency_col].to_numpy() if currency_col in df else None
+    countries = df[country_col].to_numpy() if country_col in df else None
+    labels = classify_batch(df[amount_col].to_numpy(), account_ids, currencies, countries)
+    return pd.Series(labels, index=df.index, name="classification")
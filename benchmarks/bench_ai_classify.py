@@ -0,0 +1,43 @@
+# Throughput of ai_classify_many against the stub completion server as
+# concurrency and prompt packing grow.
+# Run from the repository root: python -m benchmarks.bench_ai_classify
+import random
+import time
+
+import openai
+
+from ai_classifier import ai_classify_many
+from benchmarks.stub_openai import label_for, start_stub
+from rate_limit import TokenBucket
+
+LATENCY = 0.1
+TRANSACTIONS = 64
+
+
+def main():
+    server, base_url = start_stub(latency=LATENCY, error_rate=0.02)
+    openai.api_base = base_url
+    openai.api_key = "stub"
+
+    rng = random.Random(42)
+    transactions = [(float(rng.randrange(1_000, 2_000_000, 1_000)), []) for _ in range(TRANSACTIONS)]
+    expected = [label_for(amount) for amount, _ in transactions]
+
+    print(f"{TRANSACTIONS} transactions, {LATENCY * 1000:.0f} ms per request, 2% rate-limit errors")
+    print(f"{'concurrency':>11} {'batch':>6} {'seconds':>8} {'tx/sec':>8}")
+    for concurrency, batch_size in [(1, 1), (2, 1), (4, 1), (8, 1), (16, 1), (4, 16)]:
+        start = time.perf_counter()
+        labels = ai_classify_many(transactions, concurrency=concurrency, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        assert labels == expected
+        print(f"{concurrency:>11} {batch_size:>6} {elapsed:>8.2f} {TRANSACTIONS / elapsed:>8.1f}")
+
+    # A 20 requests/sec bucket caps throughput whatever the concurrency
+    start = time.perf_counter()
+    ai_classify_many(transactions, concurrency=16, batch_size=1, limiter=TokenBucket(20, capacity=1))
+    elapsed = time.perf_counter() - start
+    print(f"16 workers limited to 20 req/s: {TRANSACTIONS / elapsed:.1f} tx/sec")
+
+
+if __name__ == "__main__":
+    main()
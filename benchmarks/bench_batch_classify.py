@@ -0,0 +1,49 @@
+# Row-by-row classify_transaction vs the vectorized batch API.
+# Run from the repository root: python -m benchmarks.bench_batch_classify
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from batch_classify import classify_batch
+from classifier import classify_transaction
+from history_index import AmountIndex
+
+ROWS = 1_000_000
+ACCOUNTS = 10_000
+
+
+# The Send Money flow: only allowed transfers are added to the history
+def replay(amounts, account_ids):
+    histories = defaultdict(AmountIndex)
+    labels = []
+    for amount, account in zip(amounts.tolist(), account_ids.tolist()):
+        history = histories[account]
+        label = classify_transaction(amount, history)
+        if label != "Abnormal":
+            history.append(amount)
+        labels.append(label)
+    return labels
+
+
+def main():
+    rng = np.random.default_rng(42)
+    amounts = rng.choice(np.arange(1_000, 1_500_000, 5_000, dtype=float), ROWS)
+    account_ids = rng.integers(0, ACCOUNTS, ROWS)
+
+    start = time.perf_counter()
+    expected = replay(amounts, account_ids)
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels = classify_batch(amounts, account_ids)
+    batch_s = time.perf_counter() - start
+
+    mismatches = int(np.count_nonzero(labels != np.array(expected, dtype=object)))
+    print(f"rows: {ROWS:,}  accounts: {ACCOUNTS:,}  mismatches: {mismatches}")
+    print(f"scalar: {scalar_s:.2f}s ({ROWS / scalar_s:,.0f} rows/s)")
+    print(f"batch:  {batch_s:.2f}s ({ROWS / batch_s:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Bulk transfer throughput by pipeline depth against the mock riskiq API.
+# Run from the repository root: python -m benchmarks.bench_bulk_transfer
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.mock_riskiq import start_mock
+from bulk_transfer import BulkProgress, read_transfers, submit_transfers
+from http_client import RiskIQClient
+
+ROWS = 1_000
+LATENCY = 0.02
+
+
+def make_file(path):
+    rng = np.random.default_rng(42)
+    frame = pd.DataFrame({
+        "amount": rng.integers(1_000, 500_000, ROWS).astype(str),
+        "currency": rng.choice(["naira", "dollar", "euro", "pound"], ROWS),
+        "countryCode": rng.choice(["NG", "US", "UK", "EU"], ROWS),
+        "destinationAccount": [f"{n:010d}" for n in rng.integers(0, 10**10, ROWS)],
+    })
+    # A few rows the validator has to reject
+    frame.loc[::100, "amount"] = "abc"
+    frame.loc[1::100, "destinationAccount"] = "123"
+    frame.to_csv(path, index=False)
+
+
+def main():
+    server, base_url = start_mock(latency=LATENCY)
+    client = RiskIQClient(base_url, pool_size=32)
+    send = lambda data, key: client.post("transfer", json=data, headers={"Idempotency-Key": key})
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "transfers.csv")
+        make_file(path)
+        print(f"{ROWS:,} rows, {LATENCY * 1000:.0f} ms per transfer")
+        print(f"{'in flight':>9} {'rows/sec':>9} {'ok':>5} {'invalid':>8}")
+        for max_in_flight in (1, 4, 16, 32):
+            progress = BulkProgress()
+            for outcome in submit_transfers(read_transfers(path, chunksize=250), send, "ops@example.com", max_in_flight):
+                progress.add(outcome)
+            counts = progress.counts
+            print(f"{max_in_flight:>9} {progress.rows_per_sec:>9.0f} {counts['succeeded']:>5} {counts['invalid']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Time to first token and total latency of the risk-assessment chat, with
+# and without streaming, against the mock riskiq API.
+# Run from the repository root: python -m benchmarks.bench_chat_stream
+import statistics
+import time
+
+from benchmarks.mock_riskiq import start_mock
+from chat_stream import STREAM_HEADERS, extract_reply, iter_reply
+from http_client import RiskIQClient
+
+ROUNDS = 10
+PAYLOAD = {"email": "user1@example.com", "description": "Any risk?", "request": "Any risk?"}
+
+
+def blocking(client):
+    start = time.perf_counter()
+    reply = extract_reply(client.post("chat", json=PAYLOAD).json())
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, reply
+
+
+def streaming(client):
+    start = time.perf_counter()
+    first = None
+    pieces = []
+    for token in iter_reply(client.post("chat", json=PAYLOAD, stream=True, headers=STREAM_HEADERS)):
+        if first is None:
+            first = time.perf_counter() - start
+        pieces.append(token)
+    return first, time.perf_counter() - start, "".join(pieces)
+
+
+def main():
+    server, base_url = start_mock(latency=0.3, token_latency=0.05)
+    client = RiskIQClient(base_url)
+    print(f"300 ms backend latency, 50 ms per generated word, median of {ROUNDS}")
+    print(f"{'mode':<10} {'first token (ms)':>17} {'total (ms)':>11}")
+    replies = set()
+    for name, call in [("blocking", blocking), ("streaming", streaming)]:
+        results = [call(client) for _ in range(ROUNDS)]
+        replies.update(reply for _, _, reply in results)
+        first = statistics.median(r[0] for r in results) * 1000
+        total = statistics.median(r[1] for r in results) * 1000
+        print(f"{name:<10} {first:>17.0f} {total:>11.0f}")
+    # Both modes must produce the same text
+    assert len(replies) == 1, replies
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Time to first render of app.py against a slow, cold-starting mock riskiq
+# API: a first start with nothing on disk (bounded by COLD_START_WAIT), then
+# restarts that serve the persisted snapshots while they are refreshed.
+# Run from the repository root: python -m benchmarks.bench_cold_start
+import os
+import tempfile
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.mock_riskiq import start_mock
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+BACKEND_LATENCY = 10.0
+RESTARTS = 3
+
+
+def first_render():
+    # Dropping the cached resources (client, snapshot caches) makes the next
+    # run start like a new server process
+    st.cache_resource.clear()
+    start = time.perf_counter()
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    elapsed = time.perf_counter() - start
+    assert not at.exception, at.exception
+    return elapsed, len(at.selectbox) > 0
+
+
+def main():
+    server, base_url = start_mock(latency=BACKEND_LATENCY, users=1_000)
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(RISKIQ_API_BASE=base_url, SNAPSHOT_PATH=os.path.join(directory, "snapshots.db"),
+                          CHAT_STORE_PATH=os.path.join(directory, "chat.db"))
+        print(f"Backend answers after {BACKEND_LATENCY:.0f} s")
+
+        elapsed, has_users = first_render()
+        print(f"first start:  {elapsed:6.2f} s  users shown: {has_users}")
+        # Let the background fetch finish and persist the snapshot
+        time.sleep(BACKEND_LATENCY + 1)
+
+        for restart in range(1, RESTARTS + 1):
+            elapsed, has_users = first_render()
+            print(f"restart {restart}:    {elapsed:6.2f} s  users shown: {has_users}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Bytes transferred and JSON parse time for the users list: a full
+# download, gzip, gzip with field projection, and a conditional revalidation
+# of an unchanged list (304), against the mock riskiq API.
+# Run from the repository root: python -m benchmarks.bench_conditional_get
+import time
+
+import requests
+
+from benchmarks.mock_riskiq import make_users, start_mock
+from config import USERS_FIELDS
+from http_client import RiskIQClient, project
+
+SIZES = [1_000, 10_000]
+CALLS = 20
+
+
+def download(url, encoding, fields=None):
+    # One plain GET: (bytes on the wire, request ms, parse ms)
+    params = {"fields": fields} if fields else None
+    start = time.perf_counter()
+    response = requests.get(url, params=params, headers={"Accept-Encoding": encoding}, timeout=60)
+    fetched = time.perf_counter()
+    data = response.json()
+    if fields:
+        data = project(data, fields.split(","))
+    parsed = time.perf_counter()
+    return int(response.headers["Content-Length"]), (fetched - start) * 1000, (parsed - fetched) * 1000
+
+
+def report(label, samples):
+    size, request_ms, parse_ms = (sum(column) / len(samples) for column in zip(*samples))
+    print(f"{label:<22} {size / 1024:>10.1f} {request_ms:>11.2f} {parse_ms:>9.2f}")
+
+
+def main():
+    for users in SIZES:
+        server, base_url = start_mock(latency=0.0, users=users)
+        url = f"{base_url}/api/Transactions/users"
+        print(f"\n{users:,} users, mean of {CALLS} calls")
+        print(f"{'':<22} {'KiB':>10} {'request ms':>11} {'parse ms':>9}")
+        report("full JSON", [download(url, "identity") for _ in range(CALLS)])
+        report("gzip", [download(url, "gzip") for _ in range(CALLS)])
+        report("gzip + fields", [download(url, "gzip", USERS_FIELDS) for _ in range(CALLS)])
+
+        # Unchanged list: a 304 with no body, and nothing to parse
+        client = RiskIQClient(base_url)
+        client.get_json("users", fields=USERS_FIELDS)
+        samples = []
+        for _ in range(CALLS):
+            start = time.perf_counter()
+            status, _ = client.get_json("users", fields=USERS_FIELDS)
+            assert status == 304, status
+            samples.append((0, (time.perf_counter() - start) * 1000, 0.0))
+        report("revalidate (304)", samples)
+
+        # A change to the list is picked up by the next revalidation
+        handler = server.RequestHandlerClass
+        handler.users = make_users(users + 1)
+        handler.modified_at = time.time() + 1
+        status, data = client.get_json("users", fields=USERS_FIELDS)
+        assert status == 200 and len(data) == users + 1, status
+        client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
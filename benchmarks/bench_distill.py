@@ -0,0 +1,84 @@
+# Distillation end to end against the stub completion server: log LLM labels
+# for a stream of transactions, train the local model, then classify fresh
+# transactions with it and report agreement with the LLM, the share of LLM
+# calls avoided and the per-transaction latency of each path.
+# Run from the repository root: python -m benchmarks.bench_distill
+import os
+import random
+import tempfile
+import time
+
+import openai
+
+from ai_classifier import ai_classify
+from benchmarks.stub_openai import start_stub
+from distill import DistilledClassifier, LabelLog, LogisticModel, evaluate, training_data
+from history_index import AmountIndex
+
+LATENCY = 0.05
+TRAINING = 1_000
+EVALUATION = 500
+
+
+def transactions(rng, count):
+    history = AmountIndex(maxlen=1_000)
+    for _ in range(count):
+        # Mostly small transfers, some near or over the thresholds, some repeats
+        if history and rng.random() < 0.2:
+            amount = rng.choice(list(history))
+        else:
+            amount = float(rng.choice([rng.randrange(1_000, 450_000, 1_000), rng.randrange(450_000, 1_100_000, 1_000),
+                                       rng.randrange(1_000_000, 3_000_000, 1_000)]))
+        yield amount, history
+        history.append(amount)
+
+
+def main():
+    server, base_url = start_stub(latency=LATENCY)
+    openai.api_base = base_url
+    openai.api_key = "stub"
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as directory:
+        log = LabelLog(os.path.join(directory, "labels.jsonl"))
+        logged_llm = log.wrap(ai_classify)
+        start = time.perf_counter()
+        for amount, history in transactions(rng, TRAINING):
+            logged_llm(amount, history)
+        llm_ms = (time.perf_counter() - start) / TRAINING * 1000
+
+        x, y = training_data(log.read())
+        start = time.perf_counter()
+        model = LogisticModel.fit(x, y)
+        print(f"Logged {TRAINING:,} LLM labels ({llm_ms:.1f} ms each), trained in {time.perf_counter() - start:.2f}s")
+
+        # Fresh transactions: the model's answers against the LLM's
+        fresh = [(amount, AmountIndex(history)) for amount, history in transactions(rng, EVALUATION)]
+        llm_labels = [ai_classify(amount, history) for amount, history in fresh]
+        x_fresh, y_fresh = training_data([
+            {"amount": amount, "repeated_count": history.count(amount), "history_size": len(history), "label": label}
+            for (amount, history), label in zip(fresh, llm_labels)
+        ])
+        print(f"\n{'threshold':>9} {'calls avoided':>14} {'agreement':>10}")
+        for row in evaluate(model, x_fresh, y_fresh):
+            print(f"{row['threshold']:>9.2f} {row['calls_avoided']:>14.1%} {row['agreement']:>10.1%}")
+
+        classifier = DistilledClassifier(model)
+        start = time.perf_counter()
+        labels = [classifier.classify(amount, history) for amount, history in fresh]
+        elapsed = time.perf_counter() - start
+        stats = classifier.stats()
+        agreement = sum(a == b for a, b in zip(labels, llm_labels)) / len(labels)
+        # Threshold 0: every transaction is answered locally
+        local = DistilledClassifier(model, threshold=0.0)
+        start = time.perf_counter()
+        for amount, history in fresh:
+            local.classify(amount, history)
+        local_us = (time.perf_counter() - start) / len(fresh) * 1e6
+        print(f"\nServing at threshold {classifier.threshold}: {stats['avoided_rate']:.1%} of LLM calls avoided, "
+              f"{agreement:.1%} agreement with the LLM, {elapsed / len(fresh) * 1000:.2f} ms per transaction "
+              f"(local prediction {local_us:.0f} us, LLM {llm_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# Latency of classify_transaction against a plain list vs an AmountIndex.
+# Run from the repository root: python -m benchmarks.bench_history_index
+import random
+import time
+
+from classifier import classify_transaction
+from history_index import AmountIndex
+
+SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+CALLS = 200
+
+
+def time_per_call(history, amounts):
+    start = time.perf_counter()
+    for amount in amounts:
+        classify_transaction(amount, history)
+    return (time.perf_counter() - start) / len(amounts) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'history':>10} {'list (us)':>12} {'index (us)':>12}")
+    for size in SIZES:
+        amounts = [float(rng.randrange(1_000, 2_000_000, 1_000)) for _ in range(size)]
+        probes = [float(rng.randrange(1_000, 2_000_000, 1_000)) for _ in range(CALLS)]
+        index = AmountIndex(amounts)
+
+        # Both histories must give the same answers
+        for amount in probes:
+            assert classify_transaction(amount, amounts) == classify_transaction(amount, index)
+
+        list_us = time_per_call(amounts, probes)
+        index_us = time_per_call(index, probes)
+        print(f"{size:>10,} {list_us:>12.2f} {index_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Indexed counts in the shared SQLite history store as the table grows, and
+# throughput with many sessions appending and classifying at once.
+# Run from the repository root: python -m benchmarks.bench_history_store
+import os
+import random
+import tempfile
+import threading
+import time
+
+from classifier import classify_transaction
+from history_store import HistoryStore
+
+SIZES = [10_000, 100_000, 1_000_000]
+ACCOUNTS = 10_000
+CALLS = 2_000
+SESSIONS = 16
+OPERATIONS_PER_SESSION = 2_000
+
+
+def amount(rng):
+    return float(rng.randrange(1_000, 2_000_000, 1_000))
+
+
+def fill(store, rows, rng):
+    for _ in range(rows):
+        store.append(rng.randrange(ACCOUNTS), amount(rng))
+    store.flush()
+
+
+def count_latency(store, rng):
+    probes = [(rng.randrange(ACCOUNTS), amount(rng)) for _ in range(CALLS)]
+    start = time.perf_counter()
+    for account, value in probes:
+        classify_transaction(value, store.for_account(account))
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+def concurrent_sessions(store):
+    # Each session classifies a transfer and records it, like main.py
+    def session(seed):
+        rng = random.Random(seed)
+        for _ in range(OPERATIONS_PER_SESSION):
+            history = store.for_account(rng.randrange(ACCOUNTS))
+            value = amount(rng)
+            if classify_transaction(value, history) != "Abnormal":
+                history.append(value)
+
+    threads = [threading.Thread(target=session, args=(seed,)) for seed in range(SESSIONS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    return SESSIONS * OPERATIONS_PER_SESSION / (time.perf_counter() - start)
+
+
+def main():
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, "history.db"), batch_size=10_000)
+        print(f"{'rows':>10} {'classify (us)':>14}")
+        loaded = 0
+        for size in SIZES:
+            fill(store, size - loaded, rng)
+            loaded = size
+            print(f"{size:>10,} {count_latency(store, rng):>14.1f}")
+
+        print(f"\n{SESSIONS} concurrent sessions: {concurrent_sessions(store):,.0f} classify+append/sec")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Bare requests.get/post (a new connection per call) vs the shared pooled
+# RiskIQClient, against the mock riskiq API.
+# Run from the repository root: python -m benchmarks.bench_http_client
+import time
+
+import requests
+
+from benchmarks.mock_riskiq import start_mock
+from http_client import RiskIQClient
+
+CALLS = 200
+
+
+def run(label, server, call):
+    handler = server.RequestHandlerClass
+    connections = handler.connections
+    start = time.perf_counter()
+    for i in range(CALLS):
+        call(i).raise_for_status()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {elapsed / CALLS * 1000:>8.2f} ms/call {handler.connections - connections:>6} connections")
+
+
+def main():
+    server, base_url = start_mock(latency=0.0, users=10)
+    client = RiskIQClient(base_url)
+    print(f"{CALLS} GET patterns + POST transfer calls each")
+    run("bare", server, lambda i: requests.get(f"{base_url}/api/Transactions/patterns/{i}", timeout=60))
+    run("pooled", server, lambda i: client.get("patterns", f"/{i}"))
+    run("bare", server, lambda i: requests.post(f"{base_url}/api/Transactions/process", json={"amount": i}, timeout=30))
+    run("pooled", server, lambda i: client.post("transfer", json={"amount": i}))
+
+
+if __name__ == "__main__":
+    main()
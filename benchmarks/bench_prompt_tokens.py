@@ -0,0 +1,29 @@
+# Estimated ai_classify prompt size with the raw history list vs the
+# token-budgeted summary, on synthetic histories.
+# Run from the repository root: python -m benchmarks.bench_prompt_tokens
+import random
+
+from ai_classifier import estimate_tokens, summarize_history
+from history_index import AmountIndex
+from rules import get_rules
+
+SIZES = [10, 100, 1_000, 10_000, 100_000]
+
+
+def prompt_tokens(history_text, amount):
+    return estimate_tokens(f"{get_rules().prompt_text()}\nTransaction History: {history_text}\nNew Transaction Amount: {amount}")
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'history':>10} {'raw tokens':>12} {'summary tokens':>15}")
+    for size in SIZES:
+        history = AmountIndex(float(rng.randrange(1_000, 2_000_000, 1_000)) for _ in range(size))
+        amount = 50_000.0
+        raw = prompt_tokens(history, amount)
+        summarized = prompt_tokens(summarize_history(amount, history), amount)
+        print(f"{size:>10,} {raw:>12,} {summarized:>15,}")
+
+
+if __name__ == "__main__":
+    main()
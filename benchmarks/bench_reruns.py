@@ -0,0 +1,81 @@
+# Script execution time per interaction in app.py, against the mock riskiq
+# API. "full" is the whole-script rerun every interaction used to trigger;
+# "fragment" is the time spent inside the fragment that owns the widget,
+# which is all that reruns now. AppTest always executes the whole script,
+# so fragment bodies are timed by wrapping st.fragment.
+# Run from the repository root: python -m benchmarks.bench_reruns
+import os
+import statistics
+import time
+from collections import defaultdict
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.mock_riskiq import start_mock
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+ROUNDS = 20
+
+fragment_times = defaultdict(float)
+real_fragment = st.fragment
+
+
+def timed_fragment(func=None, **kwargs):
+    if func is None:
+        return lambda f: timed_fragment(f, **kwargs)
+
+    def timed(*args, **kw):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kw)
+        finally:
+            fragment_times[func.__name__] += time.perf_counter() - start
+
+    timed.__name__ = func.__name__
+    timed.__qualname__ = func.__qualname__
+    return real_fragment(timed, **kwargs)
+
+
+def measure(at, interact, fragment):
+    full, partial = [], []
+    for i in range(ROUNDS):
+        interact(at, i)
+        fragment_times.clear()
+        start = time.perf_counter()
+        at.run()
+        full.append(time.perf_counter() - start)
+        partial.append(fragment_times[fragment])
+        assert not at.exception, at.exception
+    return statistics.median(full) * 1000, statistics.median(partial) * 1000
+
+
+def send_chat(at, i):
+    at.chat_input[0].set_value(f"Any risk concerns? ({i})")
+
+
+def submit_transfer(at, i):
+    # A successful transfer closes the modal, so reopen it first
+    at.session_state["show_transfer_modal"] = True
+    at.run()
+    at.number_input[-1].set_value(100.0 + i)
+    next(b for b in at.button if "Process Transfer" in str(b.label)).click()
+
+
+def main():
+    server, base_url = start_mock(latency=0.0, users=1000)
+    os.environ["RISKIQ_API_BASE"] = base_url
+    st.fragment = timed_fragment
+
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    chat = measure(at, send_chat, "chat_panel")
+    transfer = measure(at, submit_transfer, "transfer_form")
+
+    print(f"median script time per interaction, {ROUNDS} rounds")
+    print(f"{'interaction':<18} {'full (ms)':>10} {'fragment (ms)':>14}")
+    print(f"{'chat message':<18} {chat[0]:>10.1f} {chat[1]:>14.1f}")
+    print(f"{'transfer submit':<18} {transfer[0]:>10.1f} {transfer[1]:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Backend load from the patterns cache against the mock riskiq API: many
+# sessions missing the same key at once (collapsed into one fetch), a
+# Refresh of one user against a full clear-and-refetch, and how jitter
+# spreads the expiry of entries fetched together.
+# Run from the repository root: python -m benchmarks.bench_snapshot_cache
+import threading
+
+from benchmarks.mock_riskiq import start_mock
+from http_client import RiskIQClient
+from snapshot_cache import SnapshotCache
+
+LATENCY = 0.2
+USERS = 200
+SESSIONS = 50
+
+
+def main():
+    server, base_url = start_mock(latency=LATENCY, users=USERS)
+    client = RiskIQClient(base_url, pool_size=SESSIONS)
+    handler = server.RequestHandlerClass
+
+    def load_user_patterns(user_id):
+        response = client.get("patterns", f"/{user_id}")
+        response.raise_for_status()
+        return response.json()
+
+    cache = SnapshotCache("patterns", load_user_patterns, max_workers=8)
+
+    # Concurrent misses for one key
+    before = handler.requests
+    threads = [threading.Thread(target=cache.get, args=("1",), kwargs={"wait": 5}) for _ in range(SESSIONS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"{SESSIONS} sessions missing the same key: {handler.requests - before} backend fetch(es)")
+
+    # Warm every user, then compare a Refresh of one user with clearing all
+    for user_id in range(1, USERS + 1):
+        cache.revalidate(str(user_id))
+    for user_id in range(1, USERS + 1):
+        cache.ensure(str(user_id))
+    before = handler.requests
+    cache.invalidate("1").result()
+    print(f"Refresh one user: {handler.requests - before} backend fetch(es) "
+          f"(clearing the whole cache refetches all {USERS} as they are viewed or prefetched)")
+
+    # Expiry spread for entries fetched within the same moment
+    expiries = sorted(cache.status(str(user_id))["expires_at"] for user_id in range(2, USERS + 1))
+    print(f"TTL {cache.ttl:.0f} s, jitter {cache.jitter:.0%}: {USERS - 1} entries fetched together expire "
+          f"over {expiries[-1] - expiries[0]:.1f} s instead of all at once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Structuring detection in fixed memory: sketch size next to an exact
+# per-(account, amount bucket) Counter, record and query latency, how far
+# the count-min estimates overcount, and how many split transfers are caught.
+# Run from the repository root: python -m benchmarks.bench_structuring
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+from sketch import StructuringDetector
+
+TRANSACTIONS = 500_000
+ACCOUNTS = 100_000
+PROBES = 20_000
+STRUCTURERS = 1_000
+HONEST = 1_000
+NOW = 1_700_000_000.0
+
+
+def amount(rng):
+    # Mostly everyday transfers, some larger ones
+    return float(rng.choice((rng.randrange(1_000, 50_000, 500), rng.randrange(50_000, 900_000, 1_000))))
+
+
+def load(detector, rng):
+    transactions = [(rng.randrange(ACCOUNTS), amount(rng)) for _ in range(TRANSACTIONS)]
+    start = time.perf_counter()
+    for account, value in transactions:
+        detector.record(account, value, NOW)
+    record_us = (time.perf_counter() - start) / TRANSACTIONS * 1e6
+
+    # The exact alternative: one counter per (account, bucket) key
+    tracemalloc.start()
+    exact = Counter(f"{account}|{detector.bucket(value)}" for account, value in transactions)
+    exact_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return exact, exact_bytes, record_us
+
+
+def query_latency(detector, rng):
+    probes = [(rng.randrange(ACCOUNTS), amount(rng)) for _ in range(PROBES)]
+    start = time.perf_counter()
+    for account, value in probes:
+        detector.is_structuring(account, value, timestamp=NOW)
+    return (time.perf_counter() - start) / PROBES * 1e6
+
+
+def overcount(detector, exact, rng):
+    # Estimates against exact counts for keys that were and weren't seen
+    keys = rng.sample(list(exact), PROBES // 2) + [f"unseen-{i}|{i}" for i in range(PROBES // 2)]
+    errors = [detector._current.estimate(key) - exact.get(key, 0) for key in keys]
+    assert min(errors) >= 0, "count-min must never undercount"
+    return sum(1 for e in errors if e) / len(errors), max(errors)
+
+
+def detection(detector, rng):
+    # Structurers split one transfer just over the abnormal threshold into
+    # three slightly different parts; honest accounts send one such part
+    caught = 0
+    for i in range(STRUCTURERS):
+        account = f"structurer-{i}"
+        part = rng.uniform(330_000, 400_000)
+        flagged = False
+        for _ in range(3):
+            value = round(part * rng.uniform(0.99, 1.01), -2)
+            if detector.is_structuring(account, value, timestamp=NOW):
+                flagged = True
+                break
+            detector.record(account, value, NOW)
+        caught += flagged
+
+    false_alarms = 0
+    for i in range(HONEST):
+        account = f"honest-{i}"
+        value = round(rng.uniform(330_000, 400_000), -2)
+        false_alarms += detector.is_structuring(account, value, timestamp=NOW)
+        detector.record(account, value, NOW)
+    return caught / STRUCTURERS, false_alarms / HONEST
+
+
+def main():
+    rng = random.Random(42)
+    detector = StructuringDetector()
+    exact, exact_bytes, record_us = load(detector, rng)
+    bound = detector.error_bound()
+
+    print(f"{TRANSACTIONS:,} transactions over {ACCOUNTS:,} accounts, {len(exact):,} (account, bucket) keys")
+    print(f"  sketches:      {detector.nbytes / 1024 / 1024:>8.1f} MB (fixed)")
+    print(f"  exact Counter: {exact_bytes / 1024 / 1024:>8.1f} MB (grows with keys)")
+    print(f"  record: {record_us:.1f} us   query: {query_latency(detector, rng):.1f} us")
+
+    overcounted, worst = overcount(detector, exact, rng)
+    print(f"  overcounted lookups: {overcounted:.2%}, worst overcount {worst}")
+    print(f"  bound: overcount <= {bound['epsilon'] * bound['transactions']:.2f} "
+          f"with probability >= {1 - bound['delta']:.3f}")
+
+    caught, false_alarms = detection(detector, rng)
+    print(f"\nSplit transfers caught: {caught:.1%}   honest single transfers flagged: {false_alarms:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# Latency/throughput suite for the classifier and the app's backend paths.
+# The riskiq API and the OpenAI endpoint are replaced by local mocks with
+# injectable latency. Reports p50/p95/p99 and throughput per concurrency
+# level, can save the results as a baseline and diff a later run against it.
+#
+# Run from the repository root:
+#   python -m benchmarks.load_test --save benchmarks/baseline.json
+#   python -m benchmarks.load_test --compare benchmarks/baseline.json
+import argparse
+import itertools
+import json
+import platform
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from ai_classifier import ai_classify
+from benchmarks.mock_riskiq import start_mock
+from benchmarks.stub_openai import start_stub
+from chat_stream import STREAM_HEADERS, iter_reply
+from classifier import classify_transaction
+from coalesce import Coalescer
+from history_index import AmountIndex
+from http_client import RiskIQClient
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Run `call` `requests` times with `concurrency` threads; latencies in ms
+def measure(call, requests, concurrency):
+    counter = itertools.count()
+
+    # (latency in ms, whether the call failed); failures are counted from
+    # the results rather than from a counter shared by the pool threads
+    def timed(_):
+        start = time.perf_counter()
+        try:
+            call(next(counter))
+            failed = False
+        except Exception:
+            failed = True
+        return (time.perf_counter() - start) * 1000, failed
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        outcomes = [timed(i) for i in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for latency, _ in outcomes]
+    errors = sum(failed for _, failed in outcomes)
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "throughput": requests / elapsed,
+        "errors": errors,
+    }
+
+
+def classifier_scenarios(sizes):
+    rng = random.Random(42)
+    scenarios = {}
+    for size in sizes:
+        amounts = [float(rng.randrange(1_000, 2_000_000, 1_000)) for _ in range(size)]
+        history = AmountIndex(amounts)
+        probes = [float(rng.randrange(1_000, 2_000_000, 1_000)) for _ in range(1_000)]
+        scenarios[f"classify_transaction[{size}]"] = (
+            lambda i, history=history, probes=probes: classify_transaction(probes[i % len(probes)], history)
+        )
+    return scenarios
+
+
+def backend_scenarios(client, user_count):
+    coalescer = Coalescer()
+    transfer = {"email": "user1@example.com", "type": 0, "currency": "naira", "countryCode": "NG",
+                "sourceAccount": "2345678902", "destinationAccount": "2098093020"}
+
+    def fetch_users(i):
+        response = client.get("users")
+        response.raise_for_status()
+        response.json()
+
+    def fetch_user_patterns(i):
+        response = client.get("patterns", f"/{i % user_count + 1}")
+        response.raise_for_status()
+        response.json()
+
+    def process_transfer(i):
+        # Unique amounts, so every call really reaches the backend
+        data = {**transfer, "amount": 1_000.0 + i + random.random()}
+        response, _ = coalescer.call(data, lambda key: client.post("transfer", json=data, headers={"Idempotency-Key": key}),
+                                     uuid.uuid4().hex)
+        response.raise_for_status()
+
+    def chat(i):
+        payload = {"email": "user1@example.com", "description": "Any risk?", "request": "Any risk?"}
+        "".join(iter_reply(client.post("chat", json=payload, stream=True, headers=STREAM_HEADERS)))
+
+    return {
+        "fetch_users": fetch_users,
+        "fetch_user_patterns": fetch_user_patterns,
+        "process_transfer": process_transfer,
+        "chat": chat,
+    }
+
+
+def ai_scenario():
+    rng = random.Random(7)
+    history = AmountIndex(float(rng.randrange(1_000, 2_000_000, 1_000)) for _ in range(1_000))
+    return {"ai_classify": lambda i: ai_classify(float(rng.randrange(1_000, 2_000_000, 1_000)), history)}
+
+
+def run_suite(args):
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    results = {}
+
+    def record(name, call, requests, levels):
+        for concurrency in levels:
+            stats = measure(call, requests, concurrency)
+            results[f"{name}@{concurrency}"] = stats
+            print_row(f"{name}@{concurrency}", stats)
+
+    print_header()
+    for name, call in classifier_scenarios([10, 10_000, 1_000_000]).items():
+        record(name, call, 10_000, [1])
+
+    server, base_url = start_mock(latency=args.latency, users=args.users, token_latency=args.token_latency)
+    client = RiskIQClient(base_url, pool_size=max(concurrency_levels))
+    for name, call in backend_scenarios(client, args.users).items():
+        record(name, call, args.requests, concurrency_levels)
+
+    stub, stub_url = start_stub(latency=args.llm_latency)
+    openai.api_base = stub_url
+    openai.api_key = "stub"
+    for name, call in ai_scenario().items():
+        record(name, call, args.requests, concurrency_levels)
+    return results
+
+
+def print_header():
+    print(f"{'scenario':<34} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/sec':>10} {'errors':>7}")
+
+
+def print_row(name, stats):
+    print(f"{name:<34} {stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['p99']:>9.3f} "
+          f"{stats['throughput']:>10.1f} {stats['errors']:>7}")
+
+
+def compare(results, baseline):
+    print(f"\nvs baseline ({baseline['created']}, {baseline['machine']})")
+    print(f"{'scenario':<34} {'p50':>9} {'p95':>9} {'p99':>9} {'ops/sec':>10}")
+    for name, stats in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        changes = [
+            (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("p50", "p95", "p99", "throughput")
+        ]
+        print(f"{name:<34} " + " ".join(f"{change:>+8.1f}%" for change in changes[:3]) + f" {changes[3]:>+9.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the classifier and the riskiq backend paths")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per backend scenario and level")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock riskiq API latency in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Mock chat delay per streamed word")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub completion latency in seconds")
+    parser.add_argument("--users", type=int, default=1_000, help="Users returned by the mock API")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Diff the results against this JSON baseline")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "machine": f"{platform.system()} {platform.machine()}, Python {platform.python_version()}",
+                # Only what shapes the results, not where they were read or saved
+                "settings": {key: value for key, value in vars(args).items() if key not in ("save", "compare")},
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# Local mock of the riskiq Transactions API with injectable latency.
+#
+#   python -m benchmarks.mock_riskiq --port 8002 --latency 0.05 --users 1000
+#   RISKIQ_API_BASE=http://127.0.0.1:8002 streamlit run app.py
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PREFIX = "/api/Transactions"
+
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_SIZE = 1024
+
+
+def make_users(count):
+    return [
+        {
+            "id": i,
+            "email": f"user{i}@example.com",
+            "name": f"User {i}",
+            "kycStatus": i % 3,
+            "riskLevel": ("Low", "Medium", "High")[i % 3],
+            "phoneNumber": f"+23480{i:08d}",
+            "address": f"{i} Marina Road, Lagos",
+            "createdAt": "2025-01-01T00:00:00Z",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients can reuse connections; buffered writes and
+    # TCP_NODELAY keep Nagle/delayed-ACK stalls out of the measurements
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+    latency = 0.0
+    # Chat replies are generated one word every token_latency seconds and
+    # streamed as server-sent events when the client accepts them
+    token_latency = 0.0
+    streaming = True
+    users = []
+    # When the user list last changed (Last-Modified), and whether bodies
+    # are gzipped for clients that accept it
+    modified_at = 0.0
+    compress = True
+    connections = 0
+    requests = 0
+    # Idempotency-Key -> reply of transfers already processed
+    transfers = {}
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):
+        self._start()
+        url = urlsplit(self.path)
+        path = url.path
+        query = parse_qs(url.query)
+        if path == f"{PREFIX}/users":
+            users = self.users
+            if "pageSize" in query:
+                size = int(query["pageSize"][0])
+                page = int(query.get("page", ["1"])[0])
+                users = users[(page - 1) * size:page * size]
+            self._send_conditional(users, query)
+        elif path.startswith(f"{PREFIX}/patterns/"):
+            user_id = path.rsplit("/", 1)[1]
+            self._send_conditional({"userId": user_id, "averageAmount": 125000.0, "transactionCount": 42,
+                                    "commonCountries": ["NG"], "usualHours": [9, 17]}, query)
+        else:
+            self._send(404, {"message": "Not found"})
+
+    def do_POST(self):
+        self._start()
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0]
+        if path == f"{PREFIX}/process":
+            key = self.headers.get("Idempotency-Key")
+            if key and key in self.transfers:
+                self._send(200, self.transfers[key])
+                return
+            reply = {"message": f"Transfer of {body.get('amount')} {body.get('currency')} processed"}
+            if key:
+                self.transfers[key] = reply
+            self._send(200, reply)
+        elif path == f"{PREFIX}/process-natural":
+            words = f"Risk for {body.get('email')}: Low. No concerns found.".split(" ")
+            if self.streaming and "text/event-stream" in self.headers.get("Accept", ""):
+                self._stream(words)
+            else:
+                time.sleep(self.token_latency * len(words))
+                self._send(200, {"statusMessage": " ".join(words)})
+        else:
+            self._send(404, {"message": "Not found"})
+
+    def _start(self):
+        type(self).requests += 1
+        time.sleep(self.latency)
+
+    def _send_conditional(self, payload, query):
+        # `fields=a,b` projection, then an ETag over the projected body and
+        # a Last-Modified date; matching validators get a bodiless 304
+        if "fields" in query:
+            fields = query["fields"][0].split(",")
+            project = lambda item: {field: item[field] for field in fields if field in item}
+            payload = [project(item) for item in payload] if isinstance(payload, list) else project(payload)
+        etag = '"' + hashlib.sha1(json.dumps(payload).encode()).hexdigest() + '"'
+        last_modified = formatdate(int(self.modified_at), usegmt=True)
+        headers = {"ETag": etag, "Last-Modified": last_modified}
+
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_none_match is not None:
+            not_modified = etag in [tag.strip() for tag in if_none_match.split(",")]
+        elif if_modified_since is not None:
+            try:
+                not_modified = int(self.modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                not_modified = False
+        else:
+            not_modified = False
+
+        if not_modified:
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._send(200, payload, headers)
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if self.compress and len(data) >= GZIP_MIN_SIZE and "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, words):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            time.sleep(self.token_latency)
+            self._chunk(f"data: {json.dumps({'token': word if i == 0 else ' ' + word})}\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self._chunk("")
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+# A deep listen backlog, so bursts of new connections are not dropped and
+# retried a second later (the default backlog is 5)
+class Server(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+# Serve in a background thread; returns the server and its base URL
+def start_mock(latency=0.0, users=100, port=0, token_latency=0.0, streaming=True, compress=True):
+    handler = type("Handler", (MockHandler,), {"latency": latency, "users": make_users(users), "transfers": {},
+                                               "token_latency": token_latency, "streaming": streaming,
+                                               "modified_at": time.time(), "compress": compress})
+    server = Server(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock riskiq Transactions API")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--token-latency", type=float, default=0.05)
+    parser.add_argument("--no-streaming", action="store_true")
+    parser.add_argument("--no-gzip", action="store_true")
+    args = parser.parse_args()
+    server, base_url = start_mock(args.latency, args.users, args.port, args.token_latency, not args.no_streaming,
+                                  not args.no_gzip)
+    print(f"Serving on {base_url}")
+    threading.Event().wait()
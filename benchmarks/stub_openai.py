@@ -0,0 +1,88 @@
+# Local stand-in for the OpenAI chat completions endpoint, with injectable
+# latency and rate-limit errors. Answers with the amount thresholds (history
+# is ignored), one category per "New Transaction Amount" in the prompt.
+#
+#   python -m benchmarks.stub_openai --port 8001 --latency 0.2
+#   OPENAI_API_BASE=http://127.0.0.1:8001/v1 streamlit run main.py
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AMOUNT_PATTERN = re.compile(r"New Transaction Amount: ([0-9.]+)")
+
+
+def label_for(amount):
+    if amount >= 1_000_000:
+        return "Abnormal"
+    if amount >= 500_000:
+        return "New"
+    return "Normal"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0
+    requests = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        type(self).requests += 1
+        time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}})
+            return
+
+        prompt = body["messages"][-1]["content"]
+        labels = [label_for(float(amount)) for amount in AMOUNT_PATTERN.findall(prompt)]
+        content = labels[0] if len(labels) == 1 else json.dumps(labels)
+        self._send(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# A deep listen backlog, so bursts of new connections are not dropped and
+# retried a second later (the default backlog is 5)
+class Server(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+# Serve in a background thread; returns the server and its /v1 base URL
+def start_stub(latency=0.0, error_rate=0.0, port=0):
+    handler = type("Handler", (StubHandler,), {"latency": latency, "error_rate": error_rate})
+    server = Server(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, base_url = start_stub(args.latency, args.error_rate, args.port)
+    print(f"Serving on {base_url}")
+    threading.Event().wait()
@@ -0,0 +1,131 @@
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from config import BULK_CHUNKSIZE, BULK_MAX_IN_FLIGHT
+from stream_replay import read_chunks
+from transfer_queue import describe_response
+
+CURRENCIES = ["naira", "dollar", "euro", "pound"]
+COUNTRY_CODES = ["NG", "US", "UK", "EU"]
+REQUIRED_COLUMNS = ["amount", "currency", "countryCode", "destinationAccount"]
+DEFAULT_SOURCE_ACCOUNT = "2345678902"
+
+
+# Read a bulk transfer file (CSV or Parquet, path or upload) in chunks,
+# keeping account numbers as text so leading zeros survive
+def read_transfers(source, chunksize=BULK_CHUNKSIZE):
+    return read_chunks(source, chunksize, dtype=str)
+
+
+# Validate a chunk column-wise. Returns the normalized chunk and an array
+# with an error message per row ("" for valid rows).
+def validate_chunk(chunk):
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    chunk = chunk.copy()
+    chunk["amount"] = pd.to_numeric(chunk["amount"], errors="coerce")
+    chunk["currency"] = chunk["currency"].astype(str).str.strip().str.lower()
+    chunk["countryCode"] = chunk["countryCode"].astype(str).str.strip().str.upper()
+    chunk["destinationAccount"] = chunk["destinationAccount"].astype(str).str.strip()
+
+    errors = np.select(
+        [
+            chunk["amount"].isna(),
+            chunk["amount"] <= 0,
+            ~chunk["currency"].isin(CURRENCIES),
+            ~chunk["countryCode"].isin(COUNTRY_CODES),
+            ~chunk["destinationAccount"].str.fullmatch(r"\d{10}"),
+        ],
+        [
+            "amount is not a number",
+            "amount must be positive",
+            f"currency must be one of {', '.join(CURRENCIES)}",
+            f"countryCode must be one of {', '.join(COUNTRY_CODES)}",
+            "destinationAccount must be 10 digits",
+        ],
+        default="",
+    )
+    return chunk, errors
+
+
+def optional(row, column, default):
+    # Optional columns may be absent, empty or NaN
+    value = row.get(column)
+    return value if isinstance(value, str) and value.strip() else default
+
+
+def transfer_payload(row, email):
+    return {
+        "email": optional(row, "email", email),
+        "amount": float(row["amount"]),
+        "type": 0,
+        "currency": row["currency"],
+        "countryCode": row["countryCode"],
+        "sourceAccount": optional(row, "sourceAccount", DEFAULT_SOURCE_ACCOUNT),
+        "destinationAccount": row["destinationAccount"],
+    }
+
+
+def _outcome(row_number, future):
+    try:
+        status, message = describe_response(future.result())
+    except Exception as e:
+        status, message = "failed", f"Transfer error: {str(e)}"
+    return {"row": row_number, "status": status, "message": message}
+
+
+# Submit every valid row as send(payload, idempotency_key) with at most
+# `max_in_flight` transfers outstanding. Each row's key is `batch_id` and
+# its row number, so submitting the same file again under the same
+# batch_id resends rows with their original keys. Reading stops while the pipeline is full, so the
+# file is never read far ahead of the backend. Yields one outcome per row
+# ({"row", "status", "message"}) as soon as it is known; invalid rows
+# come back as "invalid" without being sent, and rows `send` collapsed into
+# an identical one as "duplicate".
+def submit_transfers(chunks, send, email, max_in_flight=BULK_MAX_IN_FLIGHT, batch_id=None):
+    batch_id = batch_id or uuid.uuid4().hex
+    row_number = 0
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="bulk-transfer") as pool:
+        pending = {}
+        for chunk in chunks:
+            chunk, errors = validate_chunk(chunk)
+            for row, error in zip(chunk.to_dict("records"), errors):
+                row_number += 1
+                if error:
+                    yield {"row": row_number, "status": "invalid", "message": error}
+                    continue
+                while len(pending) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield _outcome(pending.pop(future), future)
+                pending[pool.submit(send, transfer_payload(row, email), f"{batch_id}-{row_number}")] = row_number
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield _outcome(pending.pop(future), future)
+
+
+# Running totals over submit_transfers outcomes
+class BulkProgress:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts = {"succeeded": 0, "failed": 0, "duplicate": 0, "invalid": 0}
+
+    def add(self, outcome):
+        self.counts[outcome["status"]] += 1
+
+    @property
+    def rows(self):
+        return sum(self.counts.values())
+
+    @property
+    def rows_per_sec(self):
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed else 0.0
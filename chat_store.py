@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+import time
+
+from config import CHAT_STORE_PATH
+
+
+# Chat messages that fell out of a session's in-memory window, kept in
+# SQLite by session and user email and read back a page at a time.
+class ChatStore:
+    def __init__(self, path=CHAT_STORE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, email TEXT, "
+                "role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS messages_email ON messages (email, session_id, id)")
+
+    # Store messages in order; returns them with their row ids
+    def append(self, session_id, messages):
+        now = time.time()
+        stored = []
+        with self._lock, self._conn:
+            for msg in messages:
+                cursor = self._conn.execute(
+                    "INSERT INTO messages (session_id, email, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, msg.get("email"), msg["role"], msg["content"], now),
+                )
+                stored.append({**msg, "id": cursor.lastrowid})
+        return stored
+
+    # Up to `limit` messages older than before_id (or the newest ones),
+    # oldest first; optionally only those sent about one user
+    def older(self, session_id, before_id=None, limit=20, email=None):
+        query = "SELECT id, email, role, content FROM messages WHERE session_id = ?"
+        params = [session_id]
+        if email is not None:
+            query += " AND email = ?"
+            params.append(email)
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{"id": id_, "email": email_, "role": role, "content": content}
+                for id_, email_, role, content in reversed(rows)]
+
+    def has_older(self, session_id, before_id=None):
+        query = "SELECT 1 FROM messages WHERE session_id = ?"
+        params = [session_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        with self._lock:
+            return self._conn.execute(query + " LIMIT 1", params).fetchone() is not None
@@ -0,0 +1,65 @@
+import json
+
+# Fields the risk-assessment endpoint may put its answer in, in order of
+# preference
+REPLY_FIELDS = ("statusMessage", "response", "message", "reply", "result")
+
+# Fields a streamed event may carry its piece of text in
+TOKEN_FIELDS = ("token", "delta", "content", "text") + REPLY_FIELDS
+
+# Ask for a stream but accept the plain JSON reply from older backends
+STREAM_HEADERS = {"Accept": "text/event-stream, application/json"}
+
+
+def extract_reply(response_data):
+    # Extract statusMessage from the response
+    if "statusMessage" in response_data:
+        return response_data["statusMessage"]
+    # Fallback to other possible response fields
+    for field in REPLY_FIELDS[1:]:
+        if field in response_data:
+            return response_data[field]
+    return f"✅ Analysis complete: {response_data}"
+
+
+def token_from_event(data):
+    # An SSE data payload: JSON with a text field, or the text itself
+    try:
+        event = json.loads(data)
+    except ValueError:
+        return data
+    if isinstance(event, dict):
+        for field in TOKEN_FIELDS:
+            if field in event:
+                return str(event[field])
+        return ""
+    return data
+
+
+# Pieces of the reply as they arrive on a response opened with stream=True:
+# server-sent events, chunked plain text, or one JSON body (non-streaming
+# backends) reduced with extract_reply.
+def iter_reply(response):
+    content_type = response.headers.get("Content-Type", "")
+    if response.encoding is None:
+        response.encoding = "utf-8"
+
+    if content_type.startswith("text/event-stream"):
+        for line in response.iter_lines(decode_unicode=True):
+            if not line.startswith("data:"):
+                continue
+            data = line[5:]
+            # Only the single space after the colon is framing
+            if data.startswith(" "):
+                data = data[1:]
+            if data == "[DONE]":
+                break
+            token = token_from_event(data)
+            if token:
+                yield token
+    elif content_type.startswith("text/plain"):
+        for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+            if chunk:
+                yield chunk
+    else:
+        yield str(extract_reply(response.json()))
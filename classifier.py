@@ -0,0 +1,16 @@
+# Rule-based transaction classification shared by the UI and offline tools.
+# Thresholds come from the compiled rule set (per currency and country).
+from rules import get_rules
+
+
+def classify_transaction(amount, history, currency=None, country=None, structuring=None):
+    # Repeated transaction check (history is a list, an AmountIndex or an
+    # AccountHistory from the shared history store)
+    repeated_count = history.count(amount)
+    label = get_rules().classify(amount, repeated_count, currency, country)
+
+    # Near-identical amounts across the account's transactions (an
+    # AccountStructuring view of the sketch-based detector)
+    if label != "Abnormal" and structuring is not None and structuring.is_structuring(amount, currency, country):
+        return "Abnormal"
+    return label
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+
+from config import TRANSFER_DEDUP_WINDOW
+
+
+def payload_digest(payload):
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# What a collapsed submission gets instead of its own result: the result
+# of the identical request it was collapsed into. Nothing was sent for it.
+Duplicate = namedtuple("Duplicate", "result")
+
+
+# Collapses identical submissions. Calls with the same canonical payload
+# that overlap share one request; a repeat within `window` seconds of a
+# kept result gets that result without a request. call() says which
+# happened, so callers can report collapsed submissions as duplicates
+# rather than as sent. The caller supplies the idempotency key: one per
+# logical transfer, reused whenever that transfer is sent again, so the
+# backend can drop a resend of a transfer it already applied, whichever
+# process it comes from.
+class Coalescer:
+    def __init__(self, window=TRANSFER_DEDUP_WINDOW, keep_result=lambda result: True, maxsize=10_000):
+        self.window = window
+        self.keep_result = keep_result
+        self.maxsize = maxsize
+        self.requests = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    # send(idempotency_key) performs the request. Returns (result,
+    # coalesced); coalesced is True when this call sent nothing and got the
+    # result of an identical request.
+    def call(self, payload, send, idempotency_key):
+        digest = payload_digest(payload)
+        with self._lock:
+            recent = self._recent.get(digest)
+            if recent is not None and recent[1] > time.monotonic():
+                self.coalesced += 1
+                return recent[0], True
+            future = self._in_flight.get(digest)
+            leader = future is None
+            if leader:
+                future = self._in_flight[digest] = Future()
+                self.requests += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = send(idempotency_key)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[digest]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[digest]
+            if self.keep_result(result):
+                self._recent[digest] = (result, time.monotonic() + self.window)
+                self._recent.move_to_end(digest)
+                while len(self._recent) > self.maxsize:
+                    self._recent.popitem(last=False)
+        future.set_result(result)
+        return result, False
+
+
+_transfer_coalescer = None
+_transfer_coalescer_lock = threading.Lock()
+
+
+# Process-wide coalescer for transfers. Only successful responses are
+# replayed; a failed transfer can be retried straight away.
+def get_transfer_coalescer():
+    global _transfer_coalescer
+    with _transfer_coalescer_lock:
+        if _transfer_coalescer is None:
+            _transfer_coalescer = Coalescer(keep_result=lambda response: response.status_code == 200)
+        return _transfer_coalescer
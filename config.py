@@ -0,0 +1,146 @@
+import os
+
+# Settings read from the environment so deployments (and benchmarks) can
+# override them without code changes.
+
+# Classifier used by the Send Money handler: "rules", "ai", "cascade" or
+# "distilled"
+CLASSIFIER_MODE = os.environ.get("CLASSIFIER_MODE", "rules")
+
+# LLM answer cache for the cascade classifier; set a path to keep it warm
+# across restarts (saved at most every AI_CACHE_SAVE_INTERVAL seconds and
+# at exit)
+AI_CACHE_PATH = os.environ.get("AI_CACHE_PATH")
+AI_CACHE_SIZE = int(os.environ.get("AI_CACHE_SIZE", "10000"))
+AI_CACHE_TTL = float(os.environ.get("AI_CACHE_TTL", str(24 * 3600)))
+AI_CACHE_SAVE_INTERVAL = float(os.environ.get("AI_CACHE_SAVE_INTERVAL", "5"))
+
+# OpenAI-compatible endpoint (e.g. a local stub server for benchmarks)
+OPENAI_API_BASE = os.environ.get("OPENAI_API_BASE")
+
+# Bulk LLM classification: parallel requests, transactions packed into one
+# prompt, and a limit on completion requests per second for the whole
+# process (0 disables it)
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "8"))
+LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", "1"))
+LLM_RATE_PER_SEC = float(os.environ.get("LLM_RATE_PER_SEC", "0"))
+LLM_MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", "5"))
+
+# Upper bound on the history summary sent in ai_classify prompts
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "200"))
+
+# riskiq backend used by app.py
+RISKIQ_API_BASE = os.environ.get("RISKIQ_API_BASE", "https://riskiq-ai-kyc-sentinel-2.onrender.com")
+
+# Shared HTTP client: connections kept per pool, connect timeout, and
+# retry/backoff for idempotent requests
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.5"))
+
+# Read timeouts per endpoint, in seconds
+USERS_TIMEOUT = float(os.environ.get("USERS_TIMEOUT", "60"))
+PATTERNS_TIMEOUT = float(os.environ.get("PATTERNS_TIMEOUT", "60"))
+TRANSFER_TIMEOUT = float(os.environ.get("TRANSFER_TIMEOUT", "30"))
+CHAT_TIMEOUT = float(os.environ.get("CHAT_TIMEOUT", "30"))
+
+# Background prefetch of user patterns: worker threads, how many users to
+# warm (the most recently used first; 0 = every user, which re-fetches the
+# whole user base every interval) and how often the same user is fetched
+# again (keep below the 300 s cache TTL)
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "4"))
+PREFETCH_LIMIT = int(os.environ.get("PREFETCH_LIMIT", "50"))
+PREFETCH_INTERVAL = float(os.environ.get("PREFETCH_INTERVAL", "240"))
+
+# Users endpoint page size (0 = the endpoint returns everyone in one
+# response) and how many matches the user selector shows per page
+USERS_PAGE_SIZE = int(os.environ.get("USERS_PAGE_SIZE", "0"))
+USER_SELECTOR_PAGE_SIZE = int(os.environ.get("USER_SELECTOR_PAGE_SIZE", "50"))
+
+# Ask the chat endpoint for a streamed reply (falls back to plain JSON)
+CHAT_STREAMING = os.environ.get("CHAT_STREAMING", "1") == "1"
+
+# Chat messages kept in session memory, how many older ones "Load older"
+# fetches at a time, how many such pages stay loaded, and the SQLite file
+# the rest are spilled to
+CHAT_WINDOW = int(os.environ.get("CHAT_WINDOW", "50"))
+CHAT_PAGE_SIZE = int(os.environ.get("CHAT_PAGE_SIZE", "20"))
+CHAT_OLDER_PAGES = int(os.environ.get("CHAT_OLDER_PAGES", "5"))
+CHAT_STORE_PATH = os.environ.get("CHAT_STORE_PATH", "chat_history.db")
+
+# Background transfer submission: transfers in flight per process, tickets
+# remembered, and how often the ticket list refreshes in the UI (seconds)
+TRANSFER_WORKERS = int(os.environ.get("TRANSFER_WORKERS", "4"))
+TRANSFER_TICKETS_KEPT = int(os.environ.get("TRANSFER_TICKETS_KEPT", "1000"))
+TRANSFER_POLL_INTERVAL = float(os.environ.get("TRANSFER_POLL_INTERVAL", "2"))
+
+# Bulk transfer upload: rows read per chunk and transfers in flight
+BULK_CHUNKSIZE = int(os.environ.get("BULK_CHUNKSIZE", "1000"))
+BULK_MAX_IN_FLIGHT = int(os.environ.get("BULK_MAX_IN_FLIGHT", "8"))
+
+# Identical transfer payloads within this many seconds are sent only once
+TRANSFER_DEDUP_WINDOW = float(os.environ.get("TRANSFER_DEDUP_WINDOW", "30"))
+
+# Metrics: port serving Prometheus text at /metrics (0 = off) and whether
+# the apps show the operator panel in the sidebar
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_PANEL = os.environ.get("METRICS_PANEL", "0") == "1"
+
+# Transaction history shared by all sessions: SQLite file, rows buffered
+# per write, how often the buffer is flushed (seconds) and the window the
+# repeated-amount rule counts over (seconds, 0 = all time)
+HISTORY_STORE_PATH = os.environ.get("HISTORY_STORE_PATH", "transaction_history.db")
+HISTORY_BATCH_SIZE = int(os.environ.get("HISTORY_BATCH_SIZE", "100"))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("HISTORY_FLUSH_INTERVAL", "0.5"))
+HISTORY_WINDOW = float(os.environ.get("HISTORY_WINDOW", "0"))
+
+# JSON rule configuration (thresholds per currency and country); unset uses
+# rules.DEFAULT_RULES
+RULES_PATH = os.environ.get("RULES_PATH")
+
+# Distilled classifier: LLM answers are logged to LABEL_LOG_PATH (unset to
+# stop logging), `python -m distill` trains DISTILLED_MODEL_PATH from them,
+# and predictions below DISTILL_THRESHOLD confidence still go to the LLM.
+# VELOCITY_WINDOW (seconds) is how far back its recent-activity features look
+LABEL_LOG_PATH = os.environ.get("LABEL_LOG_PATH", "llm_labels.jsonl")
+DISTILLED_MODEL_PATH = os.environ.get("DISTILLED_MODEL_PATH", "distilled_model.json")
+DISTILL_THRESHOLD = float(os.environ.get("DISTILL_THRESHOLD", "0.95"))
+VELOCITY_WINDOW = float(os.environ.get("VELOCITY_WINDOW", "3600"))
+
+# Users and patterns snapshots: SQLite file they persist to, background
+# refresh workers, age (seconds) after which a snapshot is refreshed, and how
+# long the first page load may wait for data that was never fetched
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "snapshots.db")
+SNAPSHOT_WORKERS = int(os.environ.get("SNAPSHOT_WORKERS", "4"))
+USERS_TTL = float(os.environ.get("USERS_TTL", "300"))
+PATTERNS_TTL = float(os.environ.get("PATTERNS_TTL", "300"))
+COLD_START_WAIT = float(os.environ.get("COLD_START_WAIT", "3"))
+
+# Snapshot TTLs are shortened by a random fraction up to this much per
+# entry, so entries fetched together are not all refreshed together
+CACHE_TTL_JITTER = float(os.environ.get("CACHE_TTL_JITTER", "0.1"))
+
+# Block transfers that look like structuring in main.py (off by default:
+# it also blocks a second similar transfer in the "New" band whose total
+# reaches the abnormal amount, and sketch overcounts can flag a first one)
+STRUCTURING_ENABLED = os.environ.get("STRUCTURING_ENABLED", "0") == "1"
+
+# Structuring detector: count-min sketch size (two sketches of width x depth
+# uint32 counters; the defaults take 32 MB), the time window, how close
+# amounts must be (relative bucket width) to count as near-identical, and
+# how many heavy hitters are tracked
+STRUCTURING_WIDTH = int(os.environ.get("STRUCTURING_WIDTH", str(1 << 20)))
+STRUCTURING_DEPTH = int(os.environ.get("STRUCTURING_DEPTH", "4"))
+STRUCTURING_WINDOW = float(os.environ.get("STRUCTURING_WINDOW", str(24 * 3600)))
+STRUCTURING_BUCKET_WIDTH = float(os.environ.get("STRUCTURING_BUCKET_WIDTH", "0.02"))
+STRUCTURING_TOP_K = int(os.environ.get("STRUCTURING_TOP_K", "100"))
+
+# Fields asked of the users and patterns endpoints (comma separated, empty
+# = all of them); app.py only shows these user fields
+USERS_FIELDS = os.environ.get("USERS_FIELDS", "email,name,id,kycStatus,riskLevel")
+PATTERNS_FIELDS = os.environ.get("PATTERNS_FIELDS", "")
+
+# Responses the HTTP client keeps (with their ETag / Last-Modified) to
+# answer 304s from, least recently used dropped first
+HTTP_REVALIDATE_CACHE_SIZE = int(os.environ.get("HTTP_REVALIDATE_CACHE_SIZE", "256"))
@@ -0,0 +1,234 @@
+# Local classifier distilled from LLM answers: ai_classify results are logged
+# with the inputs they were given, a multinomial logistic regression is fit
+# on them with NumPy, and at serve time only transactions the model is
+# unsure about still go to the LLM.
+#
+# Train from the repository root:
+#   python -m distill --log llm_labels.jsonl --model distilled_model.json
+import argparse
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from ai_classifier import CATEGORIES, ai_classify
+from config import DISTILL_THRESHOLD, DISTILLED_MODEL_PATH, LABEL_LOG_PATH, VELOCITY_WINDOW
+from rules import get_rules
+
+FEATURES = (
+    "amount_vs_new", "amount_vs_abnormal", "over_new", "over_abnormal", "log_amount",
+    "repeats", "at_repeat_limit", "repeat_share", "log_history_size",
+    "log_recent_count", "recent_amount_vs_abnormal",
+)
+
+
+# Model inputs for one transaction: the amount relative to its currency's
+# thresholds, how often it was sent before and how much of the history
+# that is, and how much the account sent in the last VELOCITY_WINDOW
+def features(amount, repeated_count, history_size, currency=None, country=None, recent_count=0, recent_amount=0.0):
+    limits = get_rules().thresholds(currency, country)
+    return [
+        amount / limits.new_amount,
+        amount / limits.abnormal_amount,
+        float(amount >= limits.new_amount),
+        float(amount >= limits.abnormal_amount),
+        math.log1p(amount),
+        float(repeated_count),
+        float(repeated_count >= limits.repeat_limit),
+        repeated_count / history_size if history_size else 0.0,
+        math.log1p(history_size),
+        math.log1p(recent_count),
+        recent_amount / limits.abnormal_amount,
+    ]
+
+
+# (count, amount) sent in the last VELOCITY_WINDOW; histories without
+# timestamps (plain lists) have none
+def velocity(history):
+    activity = getattr(history, "activity", None)
+    return activity(VELOCITY_WINDOW) if activity is not None else (0, 0.0)
+
+
+# Append-only JSONL of (inputs, LLM label) pairs. Raw inputs are stored
+# rather than feature vectors so the features can change without throwing
+# the log away; records from before a field was logged read it as 0.
+class LabelLog:
+    def __init__(self, path=LABEL_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, amount, repeated_count, history_size, label, currency=None, country=None,
+               recent_count=0, recent_amount=0.0):
+        line = json.dumps({"amount": amount, "repeated_count": repeated_count, "history_size": history_size,
+                           "recent_count": recent_count, "recent_amount": recent_amount,
+                           "currency": currency, "country": country, "label": label})
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    # ai_classify with the same signature that also logs its answers
+    def wrap(self, llm=ai_classify):
+        def classify(amount, history, currency=None, country=None):
+            label = llm(amount, history, currency, country)
+            if label in CATEGORIES:
+                self.record(amount, history.count(amount), len(history), label, currency, country,
+                            *velocity(history))
+            return label
+        return classify
+
+
+def training_data(records):
+    x = np.array([
+        features(r["amount"], r["repeated_count"], r["history_size"], r.get("currency"), r.get("country"),
+                 r.get("recent_count", 0), r.get("recent_amount", 0.0))
+        for r in records
+    ], dtype=float).reshape(-1, len(FEATURES))
+    y = np.array([CATEGORIES.index(r["label"]) for r in records], dtype=np.int64)
+    return x, y
+
+
+# Multinomial logistic regression on standardized features, fit by full
+# batch gradient descent with L2 regularization
+class LogisticModel:
+    def __init__(self, weights, bias, mean, scale):
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = np.asarray(bias, dtype=float)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+
+    @classmethod
+    def fit(cls, x, y, epochs=2_000, learning_rate=0.5, l2=1e-4):
+        mean = x.mean(axis=0)
+        scale = x.std(axis=0)
+        # Constant columns (std 0 up to rounding) are left unscaled
+        scale[scale < 1e-9] = 1.0
+        z = (x - mean) / scale
+        onehot = np.eye(len(CATEGORIES))[y]
+
+        weights = np.zeros((x.shape[1], len(CATEGORIES)))
+        bias = np.zeros(len(CATEGORIES))
+        for _ in range(epochs):
+            error = softmax(z @ weights + bias) - onehot
+            weights -= learning_rate * (z.T @ error / len(z) + l2 * weights)
+            bias -= learning_rate * error.mean(axis=0)
+        return cls(weights, bias, mean, scale)
+
+    def predict_proba(self, x):
+        return softmax((np.atleast_2d(x) - self.mean) / self.scale @ self.weights + self.bias)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"features": FEATURES, "weights": self.weights.tolist(), "bias": self.bias.tolist(),
+                       "mean": self.mean.tolist(), "scale": self.scale.tolist()}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            saved = json.load(f)
+        if tuple(saved["features"]) != FEATURES:
+            raise ValueError(f"{path} was trained on different features; retrain it")
+        return cls(saved["weights"], saved["bias"], saved["mean"], saved["scale"])
+
+
+def softmax(logits):
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+# Agreement with the LLM labels and the share of transactions the model is
+# confident about (the LLM calls it would avoid) at each threshold
+def evaluate(model, x, y, thresholds=(0.5, 0.8, 0.9, 0.95, 0.99)):
+    proba = model.predict_proba(x)
+    predicted = proba.argmax(axis=1)
+    confidence = proba.max(axis=1)
+    report = []
+    for threshold in thresholds:
+        confident = confidence >= threshold
+        report.append({
+            "threshold": threshold,
+            "calls_avoided": confident.mean() if len(y) else 0.0,
+            "agreement": (predicted[confident] == y[confident]).mean() if confident.any() else 1.0,
+        })
+    return report
+
+
+# Local model first; transactions below `threshold` confidence (or all of
+# them while there is no model yet) go to the LLM, whose answers are logged
+# for the next training run.
+class DistilledClassifier:
+    def __init__(self, model=None, llm=ai_classify, threshold=DISTILL_THRESHOLD, log=None):
+        self.model = model
+        self.threshold = threshold
+        self.llm = log.wrap(llm) if log is not None else llm
+        self.local_decisions = 0
+        self.llm_calls = 0
+
+    def classify(self, amount, history, currency=None, country=None):
+        if self.model is not None:
+            x = features(amount, history.count(amount), len(history), currency, country, *velocity(history))
+            proba = self.model.predict_proba(x)[0]
+            best = int(proba.argmax())
+            if proba[best] >= self.threshold:
+                self.local_decisions += 1
+                return CATEGORIES[best]
+        self.llm_calls += 1
+        return self.llm(amount, history, currency, country)
+
+    def stats(self):
+        total = self.local_decisions + self.llm_calls
+        return {
+            "transactions": total,
+            "local_decisions": self.local_decisions,
+            "llm_calls": self.llm_calls,
+            "llm_calls_avoided": self.local_decisions,
+            "avoided_rate": self.local_decisions / total if total else 0.0,
+        }
+
+
+def load_classifier(model_path=DISTILLED_MODEL_PATH, log_path=LABEL_LOG_PATH, threshold=DISTILL_THRESHOLD):
+    model = None
+    if model_path and os.path.exists(model_path):
+        try:
+            model = LogisticModel.load(model_path)
+        except ValueError as e:
+            # A model from before a feature change: everything goes to the
+            # LLM (and is logged) until `python -m distill` retrains it
+            print(f"Ignoring distilled model: {e}")
+    log = LabelLog(log_path) if log_path else None
+    return DistilledClassifier(model, threshold=threshold, log=log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the local classifier on logged LLM labels.")
+    parser.add_argument("--log", default=LABEL_LOG_PATH, help="JSONL label log written by the app")
+    parser.add_argument("--model", default=DISTILLED_MODEL_PATH, help="Where to save the trained model")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of the log kept for evaluation")
+    parser.add_argument("--epochs", type=int, default=2_000)
+    args = parser.parse_args(argv)
+
+    records = LabelLog(args.log).read()
+    if len(records) < 10:
+        parser.error(f"{args.log} has {len(records)} labels; log more LLM answers first")
+
+    x, y = training_data(records)
+    order = np.random.default_rng(0).permutation(len(y))
+    split = int(len(y) * (1 - args.holdout))
+    train, test = order[:split], order[split:]
+
+    model = LogisticModel.fit(x[train], y[train], epochs=args.epochs)
+    model.save(args.model)
+    print(f"Trained on {len(train):,} labels, evaluated on {len(test):,}; saved to {args.model}")
+    print(f"{'threshold':>9} {'calls avoided':>14} {'agreement':>10}")
+    for row in evaluate(model, x[test], y[test]):
+        print(f"{row['threshold']:>9.2f} {row['calls_avoided']:>14.1%} {row['agreement']:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import math
+from array import array
+from collections import Counter, deque
+
+
+# Transaction history for one account with an amount -> count index kept up
+# to date on append and eviction, so count(amount) is O(1) instead of a scan
+# of the whole history like list.count.
+class AmountIndex:
+    def __init__(self, amounts=(), maxlen=None):
+        self.maxlen = maxlen
+        self._amounts = deque()
+        self._counts = Counter()
+        for amount in amounts:
+            self.append(amount)
+
+    def append(self, amount):
+        self._amounts.append(amount)
+        self._counts[amount] += 1
+        if self.maxlen is not None and len(self._amounts) > self.maxlen:
+            self.evict()
+
+    def evict(self):
+        # Drop the oldest amount and its contribution to the index
+        amount = self._amounts.popleft()
+        self._counts[amount] -= 1
+        if self._counts[amount] == 0:
+            del self._counts[amount]
+        return amount
+
+    def count(self, amount):
+        return self._counts.get(amount, 0)
+
+    def counts(self):
+        # amount -> count for the whole history; treat as read-only
+        return self._counts
+
+    def __len__(self):
+        return len(self._amounts)
+
+    def __iter__(self):
+        return iter(self._amounts)
+
+    def __repr__(self):
+        # Same text as the plain list it replaces (used in the ai_classify prompt)
+        return repr(list(self._amounts))
+
+
+# Bounded ring buffer of (timestamp, amount) pairs backed by two array("d")
+# slots, for streaming where memory per account must stay bounded. Keeps at
+# most `capacity` transactions and, if window_seconds is set, only those
+# newer than window_seconds before the latest expire() call. The arrays
+# grow with the history up to `capacity`, so an account seen once costs one
+# slot. Empty slots hold NaN so count() can scan the whole buffer in C.
+class RingHistory:
+    def __init__(self, capacity, window_seconds=None):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self._amounts = array("d")
+        self._timestamps = array("d")
+        self._head = 0
+        self._size = 0
+
+    def append(self, amount, timestamp=0.0):
+        slots = len(self._amounts)
+        if self._size == slots and slots < self.capacity:
+            # Every slot in use but still below capacity: grow by one,
+            # unwrapping the ring first so the new slot follows the newest
+            if self._head:
+                self._amounts = self._amounts[self._head:] + self._amounts[:self._head]
+                self._timestamps = self._timestamps[self._head:] + self._timestamps[:self._head]
+                self._head = 0
+            self._amounts.append(amount)
+            self._timestamps.append(timestamp)
+            self._size += 1
+            return
+
+        tail = (self._head + self._size) % slots
+        self._amounts[tail] = amount
+        self._timestamps[tail] = timestamp
+        if self._size == slots:
+            # Full: the write replaced the oldest entry
+            self._head = (self._head + 1) % slots
+        else:
+            self._size += 1
+
+    def expire(self, now):
+        if self.window_seconds is None:
+            return
+        cutoff = now - self.window_seconds
+        slots = len(self._amounts)
+        while self._size and self._timestamps[self._head] <= cutoff:
+            self._amounts[self._head] = math.nan
+            self._head = (self._head + 1) % slots
+            self._size -= 1
+
+    def count(self, amount):
+        return self._amounts.count(amount)
+
+    def newest(self):
+        if not self._size:
+            return None
+        return self._timestamps[(self._head + self._size - 1) % len(self._amounts)]
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        capacity = len(self._amounts)
+        for offset in range(self._size):
+            yield self._amounts[(self._head + offset) % capacity]
+
+    def __repr__(self):
+        return repr(list(self))
@@ -0,0 +1,241 @@
+import atexit
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from config import HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL, HISTORY_STORE_PATH, HISTORY_WINDOW
+
+
+# Transaction history shared by every session and tab, kept in SQLite by
+# account. Appends are buffered and written in batches by a background
+# thread; counts add the buffered rows, so a repeat is seen immediately.
+# The (account, amount, ts) index turns count() into an index range scan no
+# matter how large the table grows. window_seconds (0 = all time) limits
+# counts to recent transactions.
+#
+# Reads use one connection per thread and writes a connection of their
+# own, so with WAL sessions read while a batch is being written. `_lock`
+# only guards the buffer: a read pins its snapshot of the table and copies
+# the buffered rows together, and a batch is committed together with
+# leaving the buffer, so every row is counted exactly once.
+class HistoryStore:
+    def __init__(self, path=HISTORY_STORE_PATH, batch_size=HISTORY_BATCH_SIZE,
+                 flush_interval=HISTORY_FLUSH_INTERVAL, window_seconds=HISTORY_WINDOW):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.window_seconds = window_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._readers = []
+        # Rows not written yet, and the batch being written; both counted
+        # in _pending_counts until the batch commits
+        self._pending = []
+        self._flushing = []
+        self._pending_counts = Counter()
+        self._wake = threading.Event()
+        self._closed = False
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL stays consistent with NORMAL; only the last commits can be
+            # lost on power failure, as with the in-memory buffer
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transactions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, account TEXT NOT NULL, "
+                "amount REAL NOT NULL, ts REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS transactions_account_amount_ts ON transactions (account, amount, ts)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS transactions_account_ts ON transactions (account, ts)")
+        self._writer = threading.Thread(target=self._run, daemon=True, name="history-writer")
+        self._writer.start()
+        atexit.register(self.close)
+
+    def append(self, account, amount, timestamp=None):
+        row = (str(account), float(amount), time.time() if timestamp is None else timestamp)
+        with self._lock:
+            self._pending.append(row)
+            self._pending_counts[row[:2]] += 1
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def count(self, account, amount):
+        account, amount = str(account), float(amount)
+        query = "SELECT COUNT(*) FROM transactions WHERE account = ? AND amount = ?"
+        params = [account, amount]
+        conn = self._reader()
+        with self._lock:
+            self._begin_read(conn)
+            if self.window_seconds:
+                cutoff = time.time() - self.window_seconds
+                query += " AND ts > ?"
+                params.append(cutoff)
+                pending = sum(1 for row in self._buffered() if row[:2] == (account, amount) and row[2] > cutoff)
+            else:
+                pending = self._pending_counts[(account, amount)]
+        return self._read(conn, query, params)[0][0] + pending
+
+    def counts(self, account):
+        # amount -> count for one account, over the same window as count()
+        account = str(account)
+        query = "SELECT amount, COUNT(*) FROM transactions WHERE account = ?"
+        params = [account]
+        cutoff = time.time() - self.window_seconds if self.window_seconds else None
+        if cutoff is not None:
+            query += " AND ts > ?"
+            params.append(cutoff)
+        conn = self._reader()
+        with self._lock:
+            self._begin_read(conn)
+            pending = [amount for row_account, amount, ts in self._buffered()
+                       if row_account == account and (cutoff is None or ts > cutoff)]
+        counts = Counter(dict(self._read(conn, query + " GROUP BY amount", params)))
+        counts.update(pending)
+        return counts
+
+    def size(self, account):
+        # Number of transactions for one account, over the same window
+        account = str(account)
+        query = "SELECT COUNT(*) FROM transactions WHERE account = ?"
+        params = [account]
+        cutoff = time.time() - self.window_seconds if self.window_seconds else None
+        if cutoff is not None:
+            query += " AND ts > ?"
+            params.append(cutoff)
+        conn = self._reader()
+        with self._lock:
+            self._begin_read(conn)
+            pending = sum(1 for row_account, _, ts in self._buffered()
+                          if row_account == account and (cutoff is None or ts > cutoff))
+        return self._read(conn, query, params)[0][0] + pending
+
+    def activity(self, account, seconds):
+        # (count, total amount) of the account's transactions in the last
+        # `seconds`, whatever window_seconds is; a range scan on (account, ts)
+        account = str(account)
+        cutoff = time.time() - seconds
+        conn = self._reader()
+        with self._lock:
+            self._begin_read(conn)
+            pending = [amount for row_account, amount, ts in self._buffered()
+                       if row_account == account and ts > cutoff]
+        (count, total), = self._read(
+            conn, "SELECT COUNT(*), TOTAL(amount) FROM transactions WHERE account = ? AND ts > ?", (account, cutoff)
+        )
+        return count + len(pending), total + sum(pending)
+
+    def recent(self, account, limit=20):
+        # The account's latest amounts, oldest first
+        account = str(account)
+        conn = self._reader()
+        with self._lock:
+            self._begin_read(conn)
+            pending = [amount for row_account, amount, _ in self._buffered() if row_account == account]
+        rows = self._read(conn, "SELECT amount FROM transactions WHERE account = ? ORDER BY id DESC LIMIT ?",
+                          (account, limit))
+        return ([amount for amount, in reversed(rows)] + pending)[-limit:]
+
+    def for_account(self, account):
+        return AccountHistory(self, account)
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._flushing = rows
+            if not rows:
+                return 0
+            try:
+                self._conn.executemany("INSERT INTO transactions (account, amount, ts) VALUES (?, ?, ?)", rows)
+            except sqlite3.Error:
+                self._conn.rollback()
+                with self._lock:
+                    self._pending[:0] = rows
+                    self._flushing = []
+                raise
+            # Committed under the lock, together with leaving the buffer,
+            # so no read sees a row both in the table and in the buffer
+            with self._lock:
+                self._conn.commit()
+                self._flushing = []
+                self._pending_counts -= Counter(row[:2] for row in rows)
+        return len(rows)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        self._conn.close()
+        with self._lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+
+    def _reader(self):
+        # This thread's read connection, in autocommit mode so reads can
+        # open their own transactions
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    def _begin_read(self, conn):
+        # Pin the read snapshot (called under _lock, with the buffer copy)
+        conn.execute("BEGIN")
+        conn.execute("SELECT 1 FROM transactions LIMIT 1").fetchall()
+
+    def _read(self, conn, query, params):
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.execute("COMMIT")
+
+    def _buffered(self):
+        return self._flushing + self._pending
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+# One account's view of a HistoryStore with the list-like interface the
+# classifiers use (count, counts, append, len, iteration over recent amounts),
+# plus the recent activity the distilled model uses for velocity
+class AccountHistory:
+    def __init__(self, store, account):
+        self.store = store
+        self.account = account
+
+    def append(self, amount):
+        self.store.append(self.account, amount)
+
+    def count(self, amount):
+        return self.store.count(self.account, amount)
+
+    def counts(self):
+        return self.store.counts(self.account)
+
+    def activity(self, seconds):
+        return self.store.activity(self.account, seconds)
+
+    def __len__(self):
+        return self.store.size(self.account)
+
+    def __iter__(self):
+        return iter(self.store.recent(self.account))
+
+    def __repr__(self):
+        return repr(self.store.recent(self.account))
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    CHAT_TIMEOUT,
+    HTTP_BACKOFF,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_RETRIES,
+    HTTP_REVALIDATE_CACHE_SIZE,
+    PATTERNS_TIMEOUT,
+    RISKIQ_API_BASE,
+    TRANSFER_TIMEOUT,
+    USERS_TIMEOUT,
+)
+from metrics import get_metrics
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+# Keep only `fields` of a JSON object, or of each object in a list
+def project(data, fields):
+    if isinstance(data, list):
+        return [project(item, fields) for item in data]
+    if isinstance(data, dict):
+        return {field: data[field] for field in fields if field in data}
+    return data
+
+
+def read_retry():
+    # GETs are safe to repeat on connection errors, timeouts and 5xx
+    return Retry(total=HTTP_RETRIES, backoff_factor=HTTP_BACKOFF, status_forcelist=RETRY_STATUSES,
+                 allowed_methods=["GET"], raise_on_status=False)
+
+
+def write_retry():
+    # POSTs move money or start an analysis: only retry when the
+    # connection was never made, so the request cannot have been sent
+    return Retry(total=HTTP_RETRIES, connect=HTTP_RETRIES, read=0, status=0, other=0,
+                 backoff_factor=HTTP_BACKOFF)
+
+
+# Endpoint name -> path, read timeout and retry policy
+ENDPOINTS = {
+    "users": ("/api/Transactions/users", USERS_TIMEOUT, read_retry),
+    "patterns": ("/api/Transactions/patterns", PATTERNS_TIMEOUT, read_retry),
+    "transfer": ("/api/Transactions/process", TRANSFER_TIMEOUT, write_retry),
+    "chat": ("/api/Transactions/process-natural", CHAT_TIMEOUT, write_retry),
+}
+
+
+# One requests.Session with keep-alive connection pools for the riskiq
+# backend. Each endpoint gets its own adapter so it can have its own retry
+# policy; requests picks the adapter with the longest matching prefix.
+class RiskIQClient:
+    def __init__(self, base_url=RISKIQ_API_BASE, pool_size=HTTP_POOL_SIZE,
+                 revalidate_size=HTTP_REVALIDATE_CACHE_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.headers["Content-Type"] = "application/json"
+        # requests decompresses these transparently
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        # (url, params) -> (ETag, Last-Modified, parsed body) of the last 200,
+        # for the `revalidate_size` most recently used URLs. The body is the
+        # same object handed to the caller (and kept by the snapshot cache),
+        # not a copy.
+        self.revalidate_size = revalidate_size
+        self._validators = OrderedDict()
+        self._validators_lock = threading.Lock()
+        for name, (_, _, retry) in ENDPOINTS.items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry())
+            self.session.mount(self.url(name), adapter)
+
+    def url(self, endpoint, path=""):
+        return f"{self.base_url}{ENDPOINTS[endpoint][0]}{path}"
+
+    def timeout(self, endpoint):
+        return (HTTP_CONNECT_TIMEOUT, ENDPOINTS[endpoint][1])
+
+    def request(self, method, endpoint, path="", **kwargs):
+        # Latency is measured up to the response headers; a streamed body
+        # is read by the caller afterwards
+        kwargs.setdefault("timeout", self.timeout(endpoint))
+        metrics = get_metrics()
+        with metrics.time("riskiq_request", endpoint=endpoint):
+            response = self.session.request(method, self.url(endpoint, path), **kwargs)
+        if response.status_code >= 400:
+            metrics.inc("riskiq_request_errors_total", endpoint=endpoint, kind=f"http_{response.status_code}")
+        return response
+
+    def get(self, endpoint, path="", **kwargs):
+        return self.request("GET", endpoint, path, **kwargs)
+
+    def get_json(self, endpoint, path="", params=None, fields=None):
+        # GET and parse a JSON body, as (status code, data or None). The
+        # request carries the ETag / Last-Modified of the last good response
+        # for the same URL, and a 304 returns that response's data without
+        # downloading or parsing it again. `fields` ("a,b,c") asks the
+        # backend for those fields only and is applied here as well, for
+        # backends that ignore it.
+        params = dict(params or {})
+        if fields:
+            params["fields"] = fields
+        key = (self.url(endpoint, path), tuple(sorted(params.items())))
+        with self._validators_lock:
+            cached = self._validators.get(key)
+            if cached is not None:
+                self._validators.move_to_end(key)
+        headers = {}
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        metrics = get_metrics()
+        response = self.get(endpoint, path, params=params or None, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            metrics.inc("riskiq_not_modified_total", endpoint=endpoint)
+            return 304, cached[2]
+        if response.status_code != 200:
+            return response.status_code, None
+
+        # Bytes on the wire (compressed when the backend gzips) and JSON
+        # decoding time
+        metrics.inc("riskiq_response_bytes_total", int(response.headers.get("Content-Length") or len(response.content)),
+                    endpoint=endpoint)
+        start = time.perf_counter()
+        data = response.json()
+        if fields:
+            data = project(data, fields.split(","))
+        metrics.observe("riskiq_parse_duration_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._validators_lock:
+                self._validators[key] = (etag, last_modified, data)
+                self._validators.move_to_end(key)
+                while len(self._validators) > self.revalidate_size:
+                    self._validators.popitem(last=False)
+        return 200, data
+
+    def post(self, endpoint, path="", **kwargs):
+        return self.request("POST", endpoint, path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# Process-wide client shared by every Streamlit session and thread
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = RiskIQClient()
+        return _client
@@ -1,48 +1,58 @@
 import streamlit as st
 import openai
+import time
+
+from ai_classifier import CascadeClassifier, MemoCache, ai_classify
+from classifier import classify_transaction
+from config import (
+    AI_CACHE_PATH,
+    AI_CACHE_SIZE,
+    AI_CACHE_TTL,
+    CLASSIFIER_MODE,
+    LABEL_LOG_PATH,
+    METRICS_PANEL,
+    OPENAI_API_BASE,
+    STRUCTURING_ENABLED,
+)
+from distill import LabelLog, load_classifier
+from history_store import HistoryStore
+from metrics import get_metrics
+from metrics_panel import show_metrics_panel
+from sketch import StructuringDetector
+
+script_start = time.perf_counter()
+metrics = get_metrics()
 
 # Initialize OpenAI API (replace with your keys)
 openai.api_key = "sk-..."  # Replace with your real key
+if OPENAI_API_BASE:
+    openai.api_base = OPENAI_API_BASE
 
-# Simulate transaction history (in-memory)
-if "transaction_history" not in st.session_state:
-    st.session_state.transaction_history = []
+# Transaction history shared by every session (and kept across restarts),
+# so opening a new tab does not reset the repeated-amount rule
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
 
-def classify_transaction(amount, history):
-    # Repeated transaction check
-    repeated_count = history.count(amount)
+# Near-identical amounts per account across all sessions, in fixed memory
+@st.cache_resource
+def get_structuring_detector():
+    return StructuringDetector()
 
-    if amount >= 1_000_000 or repeated_count >= 2:
-        return "Abnormal"
-    elif 500_000 <= amount < 1_000_000:
-        return "New"
-    else:
-        return "Normal"
-
-def ai_classify(amount, history):
-    prompt = f"""
-You are a financial transaction classifier.
-
-Rules:
-- "Normal": if amount is below 500000 Naira.
-- "New": if amount is 500000 or more but less than 1000000 Naira.
-- "Abnormal": if amount is 1000000 or more OR if the same amount has been sent 3 times or more.
-
-Transaction History: {history}
-New Transaction Amount: {amount}
-
-Classify the transaction strictly as one of: Normal, New, Abnormal.
-Category:
-"""
-    response = openai.ChatCompletion.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are a financial transaction classifier."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.0
-    )
-    return response.choices[0].message["content"].strip()
+# ai_classify, logging its answers as training data for the distilled model
+@st.cache_resource
+def get_llm():
+    return LabelLog().wrap(ai_classify) if LABEL_LOG_PATH else ai_classify
+
+@st.cache_resource
+def get_cascade():
+    # One cascade (and LLM answer cache) per server process
+    return CascadeClassifier(MemoCache(AI_CACHE_SIZE, AI_CACHE_TTL, AI_CACHE_PATH), llm=get_llm())
+
+# Local model trained with `python -m distill`, falling back to the LLM
+@st.cache_resource
+def get_distilled():
+    return load_classifier()
 
 # --- Streamlit UI ---
 st.title("🏦 AI Bank Transaction Agent")
@@ -56,14 +66,48 @@ if st.button("Send Money"):
     if not all([bank, account, amount, pin]):
         st.warning("Please fill in all fields.")
     else:
-        history = st.session_state.transaction_history
-        classification = classify_transaction(amount, history)
-        # Alternatively: classification = ai_classify(amount, history)
+        history = get_history_store().for_account(account)
+        structuring = get_structuring_detector().for_account(account) if STRUCTURING_ENABLED else None
+        with metrics.time("classifier", mode=CLASSIFIER_MODE):
+            if CLASSIFIER_MODE == "ai":
+                classification = get_llm()(amount, history)
+            elif CLASSIFIER_MODE == "cascade":
+                # Rules for clear-cut cases, cached LLM answers for ambiguous ones
+                classification = get_cascade().classify(amount, history)
+            elif CLASSIFIER_MODE == "distilled":
+                # Confident local predictions, the LLM for the rest
+                classification = get_distilled().classify(amount, history)
+            else:
+                classification = classify_transaction(amount, history)
+            # With STRUCTURING_ENABLED, split transfers are blocked whichever
+            # classifier answered
+            flagged = structuring is not None and classification != "Abnormal" and structuring.is_structuring(amount)
+            if flagged:
+                classification = "Abnormal"
+        metrics.inc("classifications_total", mode=CLASSIFIER_MODE, label=classification)
 
         if classification == "Abnormal":
-            st.error(f"❌ Transaction BLOCKED as {classification}.")
+            reason = " (possible structuring: near-identical amounts split across transfers)" if flagged else ""
+            st.error(f"❌ Transaction BLOCKED as {classification}{reason}.")
         else:
             history.append(amount)
+            if structuring is not None:
+                structuring.record(amount)
             st.success(f"✅ Transaction ALLOWED as {classification}. ₦{amount} sent to {bank} ({account})")
 
-        st.write("📜 Transaction History:", history)
\ No newline at end of file
+        st.write("📜 Transaction History:", list(history))
+
+        if CLASSIFIER_MODE == "cascade":
+            stats = get_cascade().stats()
+            st.caption(
+                f"Cache hit rate: {stats['cache_hit_rate']:.0%} · "
+                f"LLM calls avoided: {stats['llm_calls_avoided']}/{stats['transactions']}"
+            )
+        elif CLASSIFIER_MODE == "distilled":
+            stats = get_distilled().stats()
+            st.caption(f"LLM calls avoided: {stats['llm_calls_avoided']}/{stats['transactions']}")
+
+if METRICS_PANEL:
+    show_metrics_panel()
+
+metrics.observe("script_run_duration_seconds", time.perf_counter() - script_start, app="main")
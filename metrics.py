@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from config import METRICS_PORT
+
+# Histogram bucket upper bounds in seconds, from a cached lookup up to a
+# slow chat analysis
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Exceptions counted as timeouts rather than errors
+TIMEOUT_ERRORS = (TimeoutError, requests.exceptions.Timeout)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket, like Prometheus'
+        # histogram_quantile(); values past the last bound report that bound
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+# Process-wide latency histograms and counters, keyed by metric name and a
+# sorted tuple of label pairs. Safe to update from worker threads.
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def time(self, name, timeout_errors=TIMEOUT_ERRORS, **labels):
+        # Records <name>_duration_seconds, and <name>_errors_total with a
+        # `kind` label ("timeout" or the exception class) when the block raises
+        start = time.perf_counter()
+        try:
+            yield
+        except timeout_errors:
+            self.inc(f"{name}_errors_total", kind="timeout", **labels)
+            raise
+        except Exception as e:
+            self.inc(f"{name}_errors_total", kind=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe(f"{name}_duration_seconds", time.perf_counter() - start, **labels)
+
+    def summary(self):
+        # One row per timed operation, for the operator panel
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = dict(self._counters)
+        rows = []
+        for (name, labels), histogram in sorted(histograms):
+            base = name.removesuffix("_duration_seconds")
+            errors = timeouts = 0
+            for (counter, counter_labels), value in counters.items():
+                if counter != f"{base}_errors_total":
+                    continue
+                kind = dict(counter_labels).pop("kind", None)
+                if tuple(pair for pair in counter_labels if pair[0] != "kind") != labels:
+                    continue
+                if kind == "timeout":
+                    timeouts += value
+                else:
+                    errors += value
+            rows.append({
+                "operation": base + label_text(labels),
+                "calls": histogram.count,
+                "p50 ms": histogram.quantile(0.5) * 1000,
+                "p95 ms": histogram.quantile(0.95) * 1000,
+                "p99 ms": histogram.quantile(0.99) * 1000,
+                "mean ms": histogram.sum / histogram.count * 1000,
+                "errors": errors,
+                "timeouts": timeouts,
+            })
+        return rows
+
+    def cache_summary(self):
+        # cache_requests_total by cache; stale entries are served (and
+        # refreshed in the background), so they count towards the hit rate
+        with self._lock:
+            counters = dict(self._counters)
+        totals = {}
+        for (name, labels), value in counters.items():
+            if name == "cache_requests_total":
+                labels = dict(labels)
+                totals.setdefault(labels["cache"], {"hit": 0, "stale": 0, "miss": 0})[labels["result"]] += value
+        return [
+            {"cache": cache, "hits": counts["hit"], "stale": counts["stale"], "misses": counts["miss"],
+             "hit rate": (counts["hit"] + counts["stale"]) / sum(counts.values())}
+            for cache, counts in sorted(totals.items())
+        ]
+
+    def prometheus_text(self):
+        # Prometheus text exposition format, version 0.0.4
+        with self._lock:
+            histograms = [(key, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()]
+            counters = dict(self._counters)
+
+        lines = []
+        typed = set()
+        for (name, labels), counts, total, count in sorted(histograms):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{label_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{label_text(labels)} {total}")
+            lines.append(f"{name}_count{label_text(labels)} {count}")
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.metrics.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve /metrics for a Prometheus scraper from a background thread
+def serve_metrics(metrics, port, host="0.0.0.0"):
+    handler = type("Handler", (MetricsHandler,), {"metrics": metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+# Process-wide registry; the exporter starts with it when METRICS_PORT is set
+def get_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+            if METRICS_PORT:
+                try:
+                    serve_metrics(_metrics, METRICS_PORT)
+                except OSError as e:
+                    print(f"Metrics exporter not started on port {METRICS_PORT}: {e}")
+        return _metrics
@@ -0,0 +1,28 @@
+import streamlit as st
+
+from metrics import get_metrics
+
+
+# Operator view of the process-wide metrics, shown in the sidebar when
+# METRICS_PANEL is set
+def show_metrics_panel():
+    metrics = get_metrics()
+    with st.sidebar.expander("📈 Metrics", expanded=False):
+        rows = metrics.summary()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No calls recorded yet.")
+
+        caches = metrics.cache_summary()
+        if caches:
+            st.markdown("**Cache**")
+            st.dataframe(caches, hide_index=True, use_container_width=True)
+
+        st.download_button(
+            "Download Prometheus metrics",
+            metrics.prometheus_text(),
+            file_name="metrics.prom",
+            mime="text/plain",
+            use_container_width=True,
+        )
@@ -0,0 +1,63 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PREFETCH_INTERVAL, PREFETCH_LIMIT, PREFETCH_WORKERS
+
+
+# Calls `fetch(key)` for many keys on a bounded thread pool so that whatever
+# cache sits behind `fetch` is warm before the UI asks for them. warm()
+# never blocks; keys fetched less than `interval` seconds ago, or still in
+# flight, are skipped.
+class Prefetcher:
+    def __init__(self, fetch, max_workers=PREFETCH_WORKERS, limit=PREFETCH_LIMIT, interval=PREFETCH_INTERVAL):
+        self.fetch = fetch
+        self.limit = limit
+        self.interval = interval
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._in_flight = set()
+        self._fetched_at = {}
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def touch(self, key):
+        # Record a key the operator actually used; these are warmed first
+        with self._lock:
+            self._recent[key] = None
+            self._recent.move_to_end(key, last=False)
+            # Only the first `limit` recent keys are ever warmed
+            while self.limit and len(self._recent) > self.limit:
+                self._recent.popitem()
+
+    def warm(self, keys):
+        # Recently used keys first, then `keys` in order. With a limit only
+        # that many candidates are read from `keys`, so a rerun over a
+        # large user list costs O(limit), not O(users).
+        with self._lock:
+            recent = list(self._recent)
+        used = set(recent)
+        ordered = itertools.chain(recent, (key for key in keys if key not in used))
+        if self.limit:
+            ordered = itertools.islice(ordered, self.limit)
+        ordered = list(ordered)
+
+        now = time.monotonic()
+        with self._lock:
+            submitted = 0
+            for key in ordered:
+                if key in self._in_flight or now - self._fetched_at.get(key, -self.interval) < self.interval:
+                    continue
+                self._in_flight.add(key)
+                self._pool.submit(self._run, key)
+                submitted += 1
+        return submitted
+
+    def _run(self, key):
+        try:
+            self.fetch(key)
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+                self._fetched_at[key] = time.monotonic()
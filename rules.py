@@ -0,0 +1,153 @@
+import json
+import threading
+from collections import namedtuple
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from config import RULES_PATH
+
+LABELS = np.array(["Normal", "New", "Abnormal"], dtype=object)
+
+Thresholds = namedtuple("Thresholds", "new_amount abnormal_amount repeat_limit")
+
+# Rule configuration: `default` thresholds, then overrides matched on
+# currency, country or both. More specific overrides win: currency+country,
+# then currency, then country. Currencies are the ones transfer_form offers;
+# amounts are in the transaction's own currency.
+DEFAULT_RULES = {
+    "default_currency": "naira",
+    "default": {"new_amount": 500_000, "abnormal_amount": 1_000_000, "repeat_limit": 2},
+    "currency_names": {"naira": "Naira", "dollar": "US Dollars", "euro": "Euros", "pound": "Pounds"},
+    "overrides": [
+        {"currency": "dollar", "new_amount": 5_000, "abnormal_amount": 10_000},
+        {"currency": "euro", "new_amount": 5_000, "abnormal_amount": 10_000},
+        {"currency": "pound", "new_amount": 4_000, "abnormal_amount": 8_000},
+    ],
+}
+
+
+def format_amount(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+# A rule configuration compiled into a lookup table: every known
+# (currency, country) pair maps straight to its merged Thresholds, so a
+# transaction needs one dict lookup, and batches are classified with array
+# operations.
+class RuleSet:
+    def __init__(self, config=DEFAULT_RULES):
+        self.config = config
+        self.default_currency = config.get("default_currency")
+        self.currency_names = config.get("currency_names", {})
+        default = Thresholds(**config["default"])
+
+        overrides = {}
+        for override in config.get("overrides", []):
+            override = dict(override)
+            key = (self._currency(override.pop("currency", None)), self._country(override.pop("country", None)))
+            overrides.setdefault(key, {}).update(override)
+
+        currencies = {currency for currency, _ in overrides} | {None}
+        countries = {country for _, country in overrides} | {None}
+        self._table = {}
+        for currency, country in product(currencies, countries):
+            merged = default._asdict()
+            for key in ((None, country), (currency, None), (currency, country)):
+                merged.update(overrides.get(key, {}))
+            self._table[(currency, country)] = Thresholds(**merged)
+
+    def _currency(self, currency):
+        return currency.lower() if currency else None
+
+    def _country(self, country):
+        return country.upper() if country else None
+
+    def thresholds(self, currency=None, country=None):
+        currency = self._currency(currency or self.default_currency)
+        country = self._country(country)
+        table = self._table
+        found = table.get((currency, country))
+        if found is None:
+            # Unknown currency or country: fall back to what is known
+            found = table.get((currency, None)) or table.get((None, country)) or table[(None, None)]
+        return found
+
+    def classify(self, amount, repeated_count, currency=None, country=None):
+        limits = self.thresholds(currency, country)
+        if amount >= limits.abnormal_amount or repeated_count >= limits.repeat_limit:
+            return "Abnormal"
+        elif limits.new_amount <= amount < limits.abnormal_amount:
+            return "New"
+        else:
+            return "Normal"
+
+    # Per-row thresholds as three arrays (new_amount, abnormal_amount,
+    # repeat_limit); currencies and countries may be omitted or given per row
+    def thresholds_batch(self, size, currencies=None, countries=None):
+        currency_codes, currency_values = pd.factorize(self._column(currencies, size))
+        country_codes, country_values = pd.factorize(self._column(countries, size))
+
+        # One threshold lookup per distinct pair, then gathered per row
+        pair_codes, rows = np.unique(currency_codes * len(country_values) + country_codes, return_inverse=True)
+        limits = np.array([
+            self.thresholds(currency_values[code // len(country_values)], country_values[code % len(country_values)])
+            for code in pair_codes
+        ], dtype=float).reshape(-1, 3)[rows]
+        return Thresholds(*limits.T)
+
+    # Vectorized classify() over whole columns; `limits` can pass in
+    # thresholds_batch() results that were already computed
+    def classify_batch(self, amounts, repeated_counts, currencies=None, countries=None, limits=None):
+        amounts = np.asarray(amounts, dtype=float)
+        repeated_counts = np.asarray(repeated_counts)
+        size = len(amounts)
+        if limits is None:
+            limits = self.thresholds_batch(size, currencies, countries)
+        new_amount, abnormal_amount, repeat_limit = limits
+
+        labels = np.zeros(size, dtype=np.int8)
+        labels[(amounts >= new_amount) & (amounts < abnormal_amount)] = 1
+        labels[(amounts >= abnormal_amount) | (repeated_counts >= repeat_limit)] = 2
+        return LABELS.take(labels)
+
+    def _column(self, values, size):
+        # Missing values mean the default currency / no country
+        if values is None:
+            return np.full(size, "", dtype=object)
+        return pd.Series(values, dtype=object).fillna("").to_numpy()
+
+    # Rule text for the LLM prompt, generated from the same thresholds
+    def prompt_text(self, currency=None, country=None):
+        limits = self.thresholds(currency, country)
+        currency = self._currency(currency or self.default_currency)
+        name = self.currency_names.get(currency, currency or "")
+        new_amount = format_amount(limits.new_amount)
+        abnormal_amount = format_amount(limits.abnormal_amount)
+        return f"""Rules:
+- "Normal": if amount is below {new_amount} {name}.
+- "New": if amount is {new_amount} or more but less than {abnormal_amount} {name}.
+- "Abnormal": if amount is {abnormal_amount} or more OR if the same amount has been sent {limits.repeat_limit + 1} times or more."""
+
+
+def load_rules(path=RULES_PATH):
+    # A JSON file with the same shape as DEFAULT_RULES, or the defaults
+    if not path:
+        return RuleSet(DEFAULT_RULES)
+    with open(path) as f:
+        return RuleSet(json.load(f))
+
+
+_rules = None
+_rules_lock = threading.Lock()
+
+
+# Process-wide rule set, compiled once from RULES_PATH
+def get_rules():
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                _rules = load_rules()
+    return _rules
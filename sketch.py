@@ -0,0 +1,208 @@
+import heapq
+import math
+import threading
+import time
+from hashlib import blake2b
+
+import numpy as np
+
+from config import (
+    STRUCTURING_BUCKET_WIDTH,
+    STRUCTURING_DEPTH,
+    STRUCTURING_TOP_K,
+    STRUCTURING_WIDTH,
+    STRUCTURING_WINDOW,
+)
+from rules import get_rules
+
+
+# Count-min sketch: `depth` rows of `width` uint32 counters, memory fixed at
+# width * depth * 4 bytes whatever the number of keys. estimate() never
+# undercounts; with N additions it overcounts by more than epsilon * N with
+# probability at most delta (epsilon = e / width, delta = e^-depth).
+class CountMinSketch:
+    def __init__(self, width=STRUCTURING_WIDTH, depth=STRUCTURING_DEPTH, seed=0):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._table = np.zeros((depth, width), dtype=np.uint32)
+        self._salt = seed.to_bytes(8, "little")
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    @property
+    def nbytes(self):
+        return self._table.nbytes
+
+    def _columns(self, key):
+        # One 32-bit hash per row, all cut from a single blake2b digest.
+        # Plain ints and item() beat NumPy fancy indexing for a few cells.
+        digest = blake2b(key.encode(), digest_size=4 * self.depth, salt=self._salt).digest()
+        return [int.from_bytes(digest[4 * row:4 * row + 4], "little") % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        table = self._table
+        columns = self._columns(key)
+        for row, column in enumerate(columns):
+            table[row, column] += count
+        self.total += count
+        return min(table.item(row, column) for row, column in enumerate(columns))
+
+    def estimate(self, key):
+        table = self._table
+        return min(table.item(row, column) for row, column in enumerate(self._columns(key)))
+
+    def clear(self):
+        self._table.fill(0)
+        self.total = 0
+
+
+# The k keys with the largest sketch estimates seen so far, in O(k) memory.
+# A min-heap finds the entry to replace; heap entries left behind by later
+# updates are skipped when popped.
+class HeavyHitters:
+    def __init__(self, k=STRUCTURING_TOP_K):
+        self.k = k
+        self._counts = {}
+        self._heap = []
+
+    def offer(self, key, estimate):
+        if key in self._counts or len(self._counts) < self.k:
+            self._counts[key] = estimate
+            heapq.heappush(self._heap, (estimate, key))
+        elif estimate > self._min():
+            _, evicted = heapq.heappop(self._heap)
+            del self._counts[evicted]
+            self._counts[key] = estimate
+            heapq.heappush(self._heap, (estimate, key))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(count, key) for key, count in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def _min(self):
+        # Drop stale heap entries until the top one matches a current count
+        while self._heap and self._counts.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0]
+
+    def top(self, n=None):
+        return sorted(self._counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def clear(self):
+        self._counts.clear()
+        self._heap.clear()
+
+
+# Structuring detection over every account in fixed memory. Amounts are
+# grouped into buckets `bucket_width` wide in relative terms, so 495,000 and
+# 499,000 share a bucket, and counted per (account, bucket) in two
+# count-min sketches, for the current and the previous `window_seconds`
+# epoch. Counts therefore cover the last one to two windows.
+#
+# A transaction looks like structuring when the account already sent
+# near-identical amounts (its own bucket or the neighbouring ones) at least
+# repeat_limit times in the window, or when those amounts together with this
+# one reach the abnormal threshold: one large transfer split into smaller
+# ones to stay under it.
+class StructuringDetector:
+    def __init__(self, width=STRUCTURING_WIDTH, depth=STRUCTURING_DEPTH, window_seconds=STRUCTURING_WINDOW,
+                 bucket_width=STRUCTURING_BUCKET_WIDTH, top_k=STRUCTURING_TOP_K):
+        self.window_seconds = window_seconds
+        self.bucket_width = bucket_width
+        self._log_base = math.log1p(bucket_width)
+        self._current = CountMinSketch(width, depth, seed=1)
+        self._previous = CountMinSketch(width, depth, seed=1)
+        self._epoch = None
+        self._heavy_hitters = HeavyHitters(top_k)
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self._current.nbytes + self._previous.nbytes
+
+    def error_bound(self):
+        # Overcount per bucket lookup: at most epsilon * (transactions in the
+        # last two windows), except with probability delta
+        return {"epsilon": self._current.epsilon, "delta": self._current.delta,
+                "transactions": self._current.total + self._previous.total}
+
+    def bucket(self, amount):
+        return math.floor(math.log(amount) / self._log_base)
+
+    def bucket_range(self, bucket):
+        return math.exp(bucket * self._log_base), math.exp((bucket + 1) * self._log_base)
+
+    def record(self, account, amount, timestamp=None):
+        if amount <= 0:
+            return
+        key = f"{account}|{self.bucket(amount)}"
+        with self._lock:
+            self._rotate(time.time() if timestamp is None else timestamp)
+            estimate = self._current.add(key) + self._previous.estimate(key)
+            self._heavy_hitters.offer(key, estimate)
+
+    def near_count(self, account, amount, timestamp=None):
+        # Estimated earlier transactions of a near-identical amount: three
+        # bucket lookups in each of the two sketches, whatever the volume
+        if amount <= 0:
+            return 0
+        bucket = self.bucket(amount)
+        keys = [f"{account}|{b}" for b in (bucket - 1, bucket, bucket + 1)]
+        with self._lock:
+            self._rotate(time.time() if timestamp is None else timestamp)
+            return sum(self._current.estimate(key) + self._previous.estimate(key) for key in keys)
+
+    def is_structuring(self, account, amount, currency=None, country=None, timestamp=None):
+        near = self.near_count(account, amount, timestamp)
+        if not near:
+            return False
+        limits = get_rules().thresholds(currency, country)
+        return near >= limits.repeat_limit or (near + 1) * amount >= limits.abnormal_amount
+
+    def heavy_hitters(self, n=None):
+        # [(account, (low, high) amount range, estimated count)], largest first
+        rows = []
+        with self._lock:
+            top = self._heavy_hitters.top(n)
+        for key, count in top:
+            account, bucket = key.rsplit("|", 1)
+            rows.append((account, self.bucket_range(int(bucket)), count))
+        return rows
+
+    def for_account(self, account, timestamp=None):
+        return AccountStructuring(self, account, timestamp)
+
+    def _rotate(self, now):
+        # Late, out-of-order timestamps count towards the current window
+        epoch = math.floor(now / self.window_seconds)
+        if self._epoch is None:
+            self._epoch = epoch
+        elif epoch > self._epoch:
+            self._current, self._previous = self._previous, self._current
+            self._current.clear()
+            if epoch > self._epoch + 1:
+                # Nothing was recorded in the window before this one
+                self._previous.clear()
+            self._heavy_hitters.clear()
+            self._epoch = epoch
+
+
+# One account's view of a StructuringDetector, passed to
+# classify_transaction next to the account's history
+class AccountStructuring:
+    def __init__(self, detector, account, timestamp=None):
+        self.detector = detector
+        self.account = account
+        self.timestamp = timestamp
+
+    def is_structuring(self, amount, currency=None, country=None):
+        return self.detector.is_structuring(self.account, amount, currency, country, self.timestamp)
+
+    def record(self, amount):
+        self.detector.record(self.account, amount, self.timestamp)
@@ -0,0 +1,189 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CACHE_TTL_JITTER, SNAPSHOT_PATH, SNAPSHOT_WORKERS
+from metrics import get_metrics
+
+Snapshot = namedtuple("Snapshot", "value fetched_at")
+
+
+# Last good backend responses on local disk, so a restart can serve them
+# before the backend answers. One row per (cache, key), value stored as JSON.
+class SnapshotStore:
+    def __init__(self, path=SNAPSHOT_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "cache TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (cache, key))"
+            )
+
+    def delete(self, cache, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM snapshots WHERE cache = ? AND key = ?", (cache, key))
+
+    def load(self, cache):
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value, fetched_at FROM snapshots WHERE cache = ?", (cache,))
+            return {key: Snapshot(json.loads(value), fetched_at) for key, value, fetched_at in rows.fetchall()}
+
+    def save(self, cache, key, snapshot):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (cache, key, value, fetched_at) VALUES (?, ?, ?, ?)",
+                (cache, key, json.dumps(snapshot.value), snapshot.fetched_at),
+            )
+
+
+# Stale-while-revalidate cache over `fetch(key)` (string keys). get()
+# returns whatever snapshot is held, however old, and refreshes entries
+# older than `ttl` on a background pool; only a key that was never fetched
+# has to wait, and then at most `wait` seconds. Failed refreshes keep the
+# old snapshot and are reported by status(). With a SnapshotStore the
+# snapshots survive restarts.
+#
+# Each key has its own expiry, with the TTL randomly shortened by up to
+# `jitter` so entries fetched together don't all expire together, and at
+# most one fetch per key runs at a time: every concurrent miss, refresh or
+# invalidate() for that key waits on the same one.
+class SnapshotCache:
+    def __init__(self, name, fetch, store=None, ttl=300, jitter=CACHE_TTL_JITTER, max_workers=SNAPSHOT_WORKERS):
+        self.name = name
+        self.fetch = fetch
+        self.store = store
+        self.ttl = ttl
+        self.jitter = jitter
+        self._entries = store.load(name) if store is not None else {}
+        self._expires_at = {key: self._expiry(entry) for key, entry in self._entries.items()}
+        self._errors = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"snapshot-{name}")
+
+    def get(self, key, wait=0.0):
+        metrics = get_metrics()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            metrics.inc("cache_requests_total", cache=self.name, result="miss")
+            future = self.revalidate(key)
+            if wait:
+                try:
+                    future.result(timeout=wait)
+                except Exception:
+                    # Timed out or failed; status() reports which
+                    pass
+                with self._lock:
+                    entry = self._entries.get(key)
+            return entry
+
+        if self.is_stale(key):
+            metrics.inc("cache_requests_total", cache=self.name, result="stale")
+            self.revalidate(key)
+        else:
+            metrics.inc("cache_requests_total", cache=self.name, result="hit")
+        return entry
+
+    def peek(self, key):
+        # The held snapshot without triggering a refresh
+        with self._lock:
+            return self._entries.get(key)
+
+    def is_stale(self, key):
+        return time.time() >= self._expires_at.get(key, 0.0)
+
+    def revalidate(self, key):
+        # Fetch in the background unless a fetch for this key is running
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = self._pool.submit(self._fetch, key)
+                return future
+        get_metrics().inc("cache_fetches_collapsed_total", cache=self.name)
+        return future
+
+    def invalidate(self, key, drop=False):
+        # Refetch one key now. The old snapshot is still served until the new
+        # one arrives, unless `drop` removes it (and its copy on disk).
+        with self._lock:
+            self._expires_at[key] = 0.0
+            if drop:
+                self._entries.pop(key, None)
+        if drop and self.store is not None:
+            self.store.delete(self.name, key)
+        return self.revalidate(key)
+
+    def ensure(self, key):
+        # Blocking refresh of a missing or stale key (for prefetch workers)
+        entry = self.peek(key)
+        if entry is None or self.is_stale(key):
+            entry = self.revalidate(key).result()
+        return entry
+
+    def status(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            error = self._errors.get(key)
+            refreshing = key in self._in_flight
+        return {
+            "fetched_at": entry.fetched_at if entry else None,
+            "age": time.time() - entry.fetched_at if entry else None,
+            "expires_at": self._expires_at.get(key) if entry else None,
+            "stale": entry is not None and self.is_stale(key),
+            "refreshing": refreshing,
+            "error": error,
+        }
+
+    def _fetch(self, key):
+        try:
+            value = self.fetch(key)
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = str(e)
+                self._in_flight.pop(key, None)
+            raise
+
+        snapshot = Snapshot(value, time.time())
+        with self._lock:
+            self._entries[key] = snapshot
+            self._expires_at[key] = self._expiry(snapshot)
+            self._errors.pop(key, None)
+            self._in_flight.pop(key, None)
+        if self.store is not None:
+            self.store.save(self.name, key, snapshot)
+        return snapshot
+
+    def _expiry(self, snapshot):
+        return snapshot.fetched_at + self.ttl * (1 - self.jitter * random.random())
+
+
+def describe_age(seconds):
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} h ago"
+    return f"{int(seconds // 86400)} days ago"
+
+
+# One-line data freshness note for the UI
+def describe_status(status, what):
+    if status["age"] is None:
+        if status["error"]:
+            return f"⚠️ Couldn't load {what}: {status['error']}"
+        return f"⏳ Loading {what}…"
+    text = f"{what.capitalize()} updated {describe_age(status['age'])}"
+    if status["error"]:
+        text = f"⚠️ Backend unavailable ({status['error']}), showing {what} from {describe_age(status['age'])}"
+    elif status["refreshing"]:
+        text += " · refreshing…"
+    return text
@@ -0,0 +1,178 @@
+# Streaming replay: classify transactions from a JSONL/CSV/Parquet file in
+# chunks, keeping a bounded, optionally time-windowed history per account.
+#
+#   python stream_replay.py transactions.parquet --window-size 100 --window 24h
+import argparse
+import os
+import resource
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from classifier import classify_transaction
+from history_index import RingHistory
+from sketch import StructuringDetector
+
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_WINDOW_SIZE = 100
+DEFAULT_MAX_ACCOUNTS = 1_000_000
+WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_window(text):
+    # "90s", "30m", "24h", "7d" or plain seconds
+    if text is None:
+        return None
+    unit = text[-1].lower()
+    if unit in WINDOW_UNITS:
+        return float(text[:-1]) * WINDOW_UNITS[unit]
+    return float(text)
+
+
+# `source` is a path or a named file object (e.g. a Streamlit upload);
+# `dtype` is passed to the CSV and JSON readers
+def read_chunks(source, chunksize=DEFAULT_CHUNKSIZE, dtype=None):
+    name = source if isinstance(source, str) else source.name
+    extension = os.path.splitext(name)[1].lower()
+    if extension in (".jsonl", ".json", ".ndjson"):
+        yield from pd.read_json(source, lines=True, chunksize=chunksize, dtype=dtype)
+    elif extension == ".csv":
+        yield from pd.read_csv(source, chunksize=chunksize, dtype=dtype)
+    elif extension in (".parquet", ".pq"):
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported file type: {extension}")
+
+
+def to_seconds(column):
+    # Epoch seconds, from numbers or anything pd.to_datetime understands
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=float)
+    return pd.to_datetime(column, utc=True).to_numpy().astype("datetime64[ns]").astype(np.int64) / 1e9
+
+
+# Generator over classified chunks. Each yielded chunk is the input chunk
+# with a "classification" column added. Only allowed transactions enter the
+# history, as in the Send Money handler. Without a time column, rows are
+# stamped with their position in the stream; a time window then needs one
+# and raises ValueError. With a StructuringDetector, near-identical amounts
+# split across transactions are flagged too.
+#
+# Memory is bounded by max_accounts x window_size transactions: each
+# account keeps at most window_size of them (buffers grow only as far as
+# needed), and past max_accounts (0 = no limit) the least recently active
+# account's history is dropped, so its next transactions start afresh.
+def replay(chunks, window_size=DEFAULT_WINDOW_SIZE, window_seconds=None,
+           amount_col="amount", account_col="account_id", time_col="timestamp", structuring=None,
+           max_accounts=DEFAULT_MAX_ACCOUNTS):
+    histories = OrderedDict()
+    position = 0
+
+    for chunk in chunks:
+        amounts = chunk[amount_col].to_numpy(dtype=float).tolist()
+        if account_col in chunk:
+            accounts = chunk[account_col].tolist()
+        else:
+            accounts = [None] * len(amounts)
+        if time_col in chunk:
+            timestamps = to_seconds(chunk[time_col]).tolist()
+        elif window_seconds is not None:
+            raise ValueError(f"A time window needs a {time_col!r} column")
+        else:
+            timestamps = range(position, position + len(amounts))
+        position += len(amounts)
+
+        labels = []
+        for amount, account, timestamp in zip(amounts, accounts, timestamps):
+            history = histories.get(account)
+            if history is None:
+                history = histories[account] = RingHistory(window_size, window_seconds)
+                if max_accounts and len(histories) > max_accounts:
+                    histories.popitem(last=False)
+            elif max_accounts:
+                histories.move_to_end(account)
+            history.expire(timestamp)
+
+            account_structuring = structuring.for_account(account, timestamp) if structuring is not None else None
+            label = classify_transaction(amount, history, structuring=account_structuring)
+            if label != "Abnormal":
+                history.append(amount, timestamp)
+                if account_structuring is not None:
+                    account_structuring.record(amount)
+            labels.append(label)
+
+        if window_seconds is not None and labels:
+            # Accounts with nothing inside the window no longer need a buffer
+            cutoff = timestamp - window_seconds
+            for account in [a for a, h in histories.items() if not len(h) or h.newest() <= cutoff]:
+                del histories[account]
+
+        yield chunk.assign(classification=labels)
+
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay transactions through classify_transaction.")
+    parser.add_argument("path", help="JSONL, CSV or Parquet file")
+    parser.add_argument("--output", help="Write classified rows to this CSV file")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--window-size", type=int, default=DEFAULT_WINDOW_SIZE,
+                        help="Transactions kept per account")
+    parser.add_argument("--max-accounts", type=int, default=DEFAULT_MAX_ACCOUNTS,
+                        help="Accounts with a history in memory; the least recently active one is "
+                             "forgotten past this (0 = no limit). Memory is at most about "
+                             "max-accounts x window-size x 16 bytes")
+    parser.add_argument("--window", help="Time window per account, e.g. 24h (needs a timestamp column)")
+    parser.add_argument("--amount-col", default="amount")
+    parser.add_argument("--account-col", default="account_id")
+    parser.add_argument("--time-col", default="timestamp")
+    parser.add_argument("--structuring", action="store_true",
+                        help="Also flag near-identical amounts split across transactions")
+    args = parser.parse_args(argv)
+
+    rows = 0
+    counts = {"Normal": 0, "New": 0, "Abnormal": 0}
+    structuring = StructuringDetector() if args.structuring else None
+    start = time.perf_counter()
+    chunks = replay(
+        read_chunks(args.path, args.chunksize),
+        window_size=args.window_size,
+        window_seconds=parse_window(args.window),
+        max_accounts=args.max_accounts,
+        amount_col=args.amount_col,
+        account_col=args.account_col,
+        time_col=args.time_col,
+        structuring=structuring,
+    )
+    try:
+        for i, chunk in enumerate(chunks):
+            rows += len(chunk)
+            for label, count in chunk["classification"].value_counts().items():
+                counts[label] += int(count)
+            if args.output:
+                chunk.to_csv(args.output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+
+    print(f"Rows: {rows:,}  " + "  ".join(f"{label}: {count:,}" for label, count in counts.items()))
+    print(f"Throughput: {rows / elapsed if elapsed else 0:,.0f} rows/sec ({elapsed:.2f}s)")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+    if structuring is not None:
+        print(f"Structuring sketches: {structuring.nbytes / 1024 / 1024:.0f} MB")
+        for account, (low, high), count in structuring.heavy_hitters(10):
+            print(f"  {account}: ~{count} transfers of {low:,.0f}-{high:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from coalesce import Duplicate
+from config import TRANSFER_TICKETS_KEPT, TRANSFER_WORKERS
+
+
+# Outcome of a transfer request as (status, message), status being
+# "succeeded", "failed" or "duplicate" (collapsed into an identical
+# transfer, so not sent again)
+def describe_response(response):
+    if isinstance(response, Duplicate):
+        status, message = describe_response(response.result)
+        return "duplicate", f"Duplicate — not sent again (identical transfer {status}: {message})"
+    if response is None:
+        return "failed", "Transfer failed due to connection error"
+    try:
+        response_data = response.json()
+    except json.JSONDecodeError:
+        response_data = {}
+    if not isinstance(response_data, dict):
+        response_data = {}
+    if response.status_code == 200:
+        return "succeeded", response_data.get("message", "Transfer processed successfully!")
+    return "failed", response_data.get("message", f"Transfer failed: {response.status_code} - {response.text}")
+
+
+# Runs transfers on a bounded worker pool as send(transfer_data, ticket_id);
+# the ticket id doubles as the transfer's idempotency key, so retry() of a
+# failed ticket can't apply it twice. submit() returns the ticket id at
+# once; status() reports the ticket as it moves through "queued",
+# "processing" and "succeeded"/"failed"/"duplicate". Only the most recent
+# tickets are kept.
+class TransferQueue:
+    def __init__(self, send, max_in_flight=TRANSFER_WORKERS, keep=TRANSFER_TICKETS_KEPT):
+        self.send = send
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="transfer")
+        self._tickets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, transfer_data):
+        ticket_id = uuid.uuid4().hex
+        with self._lock:
+            self._tickets[ticket_id] = {
+                "id": ticket_id,
+                "transfer": transfer_data,
+                "status": "queued",
+                "message": None,
+                "submitted_at": time.time(),
+                "finished_at": None,
+            }
+            while len(self._tickets) > self.keep:
+                self._tickets.popitem(last=False)
+        self._pool.submit(self._run, ticket_id, transfer_data)
+        return ticket_id
+
+    def retry(self, ticket_id):
+        # Send a failed ticket again, under the same id
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is None or ticket["status"] != "failed":
+                return False
+            ticket.update(status="queued", message=None, finished_at=None)
+            transfer_data = ticket["transfer"]
+        self._pool.submit(self._run, ticket_id, transfer_data)
+        return True
+
+    def status(self, ticket_id):
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            return dict(ticket) if ticket else None
+
+    def _update(self, ticket_id, **fields):
+        with self._lock:
+            if ticket_id in self._tickets:
+                self._tickets[ticket_id].update(fields)
+
+    def _run(self, ticket_id, transfer_data):
+        self._update(ticket_id, status="processing")
+        try:
+            status, message = describe_response(self.send(transfer_data, ticket_id))
+        except Exception as e:
+            status, message = "failed", f"Transfer error: {str(e)}"
+        self._update(ticket_id, status=status, message=message, finished_at=time.time())
@@ -0,0 +1,57 @@
+from bisect import bisect_left, bisect_right
+
+
+# Search index over a user list, built once per user-list refresh. Prefix
+# matches on the email, its local part and each word of the name come from
+# a sorted token list (bisect); other substring matches come from one
+# lowercased "email\tname" haystack scanned with str.find.
+class UserIndex:
+    def __init__(self, users):
+        self.users = users
+        self._tokens = []
+        rows = []
+        for i, user in enumerate(users):
+            email = str(user.get('email') or '').lower()
+            name = str(user.get('name') or '').lower()
+            for token in {email, email.split('@')[0], *name.split()}:
+                if token:
+                    self._tokens.append((token, i))
+            rows.append(f"{email}\t{name}")
+        self._tokens.sort()
+        self._haystack = "\n".join(rows)
+        self._starts = []
+        offset = 0
+        for row in rows:
+            self._starts.append(offset)
+            offset += len(row) + 1
+
+    def __len__(self):
+        return len(self.users)
+
+    def label(self, i):
+        user = self.users[i]
+        return f"{user.get('email', 'Unknown')} - {user.get('name', 'No Name')}"
+
+    # Positions of matching users: prefix matches first, then the remaining
+    # substring matches, each in list order. An empty query matches everyone.
+    def search(self, query):
+        query = query.strip().lower()
+        if not query:
+            return range(len(self.users))
+
+        lo = bisect_left(self._tokens, (query,))
+        hi = bisect_right(self._tokens, (query + "\uffff",))
+        prefix = sorted({i for _, i in self._tokens[lo:hi]})
+
+        seen = set(prefix)
+        substring = []
+        position = self._haystack.find(query)
+        while position != -1:
+            i = bisect_right(self._starts, position) - 1
+            if i not in seen:
+                seen.add(i)
+                substring.append(i)
+            # Continue after this user's row
+            next_start = self._starts[i + 1] if i + 1 < len(self._starts) else len(self._haystack)
+            position = self._haystack.find(query, next_start)
+        return prefix + substring